@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional, Callable
+
+import testAI
+from testAI import (Colors, QuadraTurboTest, ExtractionCache, FakeAnthropicClient, QuestionStreamParser, RequestScheduler,
+                    ContentCompactor)
+
+
+class SyntheticDocuments:
+    
+    WORDS = """
+        cell membrane nucleus protein enzyme energy organism tissue evolution species genome mutation
+        photosynthesis chlorophyll glucose oxygen respiration mitochondria ribosome chromosome heredity
+        ecosystem population habitat biome predator nutrient molecule reaction catalyst structure
+        function system process example theory experiment observation variable hypothesis result
+    """.split()
+    
+    def __init__(self, directory: Path, seed: int = 1234):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.rng = random.Random(seed)
+    
+    def sentence(self) -> str:
+        words = [self.rng.choice(self.WORDS) for _ in range(self.rng.randint(8, 18))]
+        return ' '.join(words).capitalize() + '.'
+    
+    def paragraph(self) -> str:
+        return ' '.join(self.sentence() for _ in range(self.rng.randint(3, 6)))
+    
+    def write_txt(self, name: str, size: int) -> Path:
+        path = self.directory / name
+        written = 0
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            while written < size:
+                paragraph = self.paragraph() + '\n\n'
+                f.write(paragraph)
+                written += len(paragraph)
+        
+        return path
+    
+    def write_md(self, name: str, size: int) -> Path:
+        path = self.directory / name
+        written = 0
+        section = 0
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            while written < size:
+                section += 1
+                block = f"## Section {section}\n\n{self.paragraph()}\n\n- {self.sentence()}\n- {self.sentence()}\n\n"
+                f.write(block)
+                written += len(block)
+        
+        return path
+    
+    def write_pdf(self, name: str, pages: int, lines_per_page: int = 40) -> Path:
+        objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+        kids = ' '.join(f"{3 + 2 * i} 0 R" for i in range(pages))
+        objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode('latin-1'))
+        font_id = 3 + 2 * pages
+        
+        for i in range(pages):
+            operations = ["BT /F1 10 Tf 12 TL 40 760 Td", f"(Synthetic Course - Page {i + 1}) Tj T*"]
+            for _ in range(lines_per_page):
+                line = ' '.join(self.rng.choice(self.WORDS) for _ in range(12))
+                operations.append(f"({line}) Tj T*")
+            operations.append("ET")
+            stream = '\n'.join(operations).encode('latin-1')
+            
+            objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                           f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode('latin-1'))
+            objects.append(b"<< /Length " + str(len(stream)).encode('latin-1') + b" >>\nstream\n" + stream + b"\nendstream")
+        
+        objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        
+        output = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(output))
+            output += f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n"
+        
+        xref = len(output)
+        output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+        for offset in offsets:
+            output += f"{offset:010d} 00000 n \n".encode('latin-1')
+        output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+        
+        path = self.directory / name
+        with open(path, 'wb') as f:
+            f.write(output)
+        return path
+    
+    def quiz_response(self, count: int) -> str:
+        questions = []
+        for i in range(count):
+            answer = self.rng.choice('ABCD')
+            questions.append({
+                'pregunta': f"{self.sentence()[:-1]}?",
+                'opciones': {letter: self.sentence() for letter in 'ABCD'},
+                'respuesta_correcta': answer,
+                'explicacion': self.sentence()
+            })
+        return "```json\n" + json.dumps({'preguntas': questions}, ensure_ascii=False, indent=2) + "\n```"
+
+
+class BenchmarkSuite:
+    
+    SIZES = {
+        'full': {'pdf_pages': [10, 100, 400], 'text_bytes': [100_000, 1_000_000, 8_000_000], 'questions': [10, 50, 200]},
+        'quick': {'pdf_pages': [5, 30], 'text_bytes': [50_000, 500_000], 'questions': [10, 50]}
+    }
+    
+    def __init__(self, workdir: Path, repeats: int = 3, latency: float = 0.5, quick: bool = False,
+                 workers: Optional[int] = None, responses: Optional[str] = None):
+        self.workdir = Path(workdir)
+        self.repeats = max(1, repeats)
+        self.latency = latency
+        self.sizes = self.SIZES['quick' if quick else 'full']
+        self.workers = workers
+        self.responses = responses
+        self.documents = SyntheticDocuments(self.workdir / 'docs')
+        self.results: List[Dict] = []
+    
+    def measure(self, name: str, func: Callable[[], object], setup: Optional[Callable[[], None]] = None, **extra) -> Dict:
+        timings = []
+        
+        for _ in range(self.repeats):
+            if setup is not None:
+                setup()
+            
+            with redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+        
+        median = statistics.median(timings)
+        result = {
+            'benchmark': name,
+            'seconds_median': round(median, 6),
+            'seconds_min': round(min(timings), 6),
+            'seconds_max': round(max(timings), 6),
+            'repeats': len(timings)
+        }
+        
+        for key, value in extra.items():
+            result[key] = value
+        
+        for key, amount in list(extra.items()):
+            if key.endswith('_count') and median > 0:
+                result[key.replace('_count', '_per_second')] = round(amount / median, 2)
+        
+        self.results.append(result)
+        print(f"  {Colors.CYAN}{name:<40}{Colors.ENDC} {median * 1000:10.2f} ms")
+        return result
+    
+    def make_app(self, cache: Optional[ExtractionCache] = None, latency: float = 0.0) -> QuadraTurboTest:
+        app = QuadraTurboTest(cache, self.workers, bank=None, scheduler=RequestScheduler(0, 0))
+        app.client = (FakeAnthropicClient.from_recording(self.responses, latency) if self.responses
+                      else FakeAnthropicClient(latency))
+        return app
+    
+    def bench_pdf_extraction(self):
+        if testAI.optional_import('PyPDF2') is None:
+            print(f"{Colors.YELLOW}⚠ PyPDF2 no instalado: se omiten las pruebas de PDF{Colors.ENDC}")
+            return
+        
+        print(f"\n{Colors.BOLD}📄 Extracción de PDF{Colors.ENDC}")
+        
+        for pages in self.sizes['pdf_pages']:
+            path = self.documents.write_pdf(f"synthetic-{pages}p.pdf", pages)
+            megabytes = path.stat().st_size / 1e6
+            app = self.make_app()
+            
+            result = self.measure(f"extract.pdf.{pages}p", lambda: app.read_file_content(str(path)),
+                                  pages_count=pages, megabytes_count=round(megabytes, 3))
+            result['mb_per_second'] = result.pop('megabytes_per_second', 0.0)
+            
+            self.measure(f"extract.pdf.{pages}p.budgeted",
+                         lambda: app.read_files_budgeted([str(path)], app.PROMPT_TOKEN_BUDGET * ContentCompactor.CHARS_PER_TOKEN))
+            
+            pages_text = list(app.extract_file_pages(str(path)))
+            raw_tokens = ContentCompactor.estimate_tokens("\n".join(pages_text))
+            compacted = ContentCompactor.compact(pages_text)
+            self.measure(f"compact.pdf.{pages}p", lambda: ContentCompactor.compact(pages_text), pages_count=pages,
+                         tokens_before=raw_tokens, tokens_after=ContentCompactor.estimate_tokens(compacted))
+            
+            cache = ExtractionCache(self.workdir / f'cache-{pages}', 1024 * 1024 * 1024)
+            cached_app = self.make_app(cache)
+            cached_app.read_file_content(str(path))
+            self.measure(f"extract.pdf.{pages}p.cached", lambda: cached_app.read_file_content(str(path)),
+                         pages_count=pages)
+            
+            app.extractor.close()
+    
+    def bench_text_extraction(self):
+        print(f"\n{Colors.BOLD}📝 Lectura de TXT/MD{Colors.ENDC}")
+        
+        for size in self.sizes['text_bytes']:
+            for extension, writer in (('txt', self.documents.write_txt), ('md', self.documents.write_md)):
+                path = writer(f"synthetic-{size}.{extension}", size)
+                megabytes = path.stat().st_size / 1e6
+                app = self.make_app()
+                
+                result = self.measure(f"extract.{extension}.{size // 1000}kb", lambda: app.read_file_content(str(path)),
+                                      megabytes_count=round(megabytes, 3))
+                result['mb_per_second'] = result.pop('megabytes_per_second', 0.0)
+    
+    def bench_parsing(self):
+        print(f"\n{Colors.BOLD}🧩 Análisis y validación de respuestas{Colors.ENDC}")
+        
+        for count in self.sizes['questions']:
+            response = self.documents.quiz_response(count)
+            app = self.make_app()
+            app.client = FakeAnthropicClient(0.0, responses=[response])
+            
+            self.measure(f"parse.json.{count}q", lambda: app.request_questions("contenido " * 50, count, 'medio'),
+                         questions_count=count)
+            
+            def parse_stream():
+                parser = QuestionStreamParser()
+                parsed = []
+                for start in range(0, len(response), 64):
+                    parsed.extend(q for q in parser.feed(response[start:start + 64]) if app.validate_question(q) is None)
+                return parsed
+            
+            self.measure(f"parse.stream.{count}q", parse_stream, questions_count=count)
+    
+    def bench_end_to_end(self):
+        print(f"\n{Colors.BOLD}🚀 Construcción completa del test (API falsa, {self.latency}s por llamada){Colors.ENDC}")
+        
+        sources = [self.documents.write_txt('e2e.txt', self.sizes['text_bytes'][-1])]
+        if testAI.optional_import('PyPDF2') is not None:
+            sources.append(self.documents.write_pdf('e2e.pdf', self.sizes['pdf_pages'][-1]))
+        
+        for source in sources:
+            for count in self.sizes['questions'][:2]:
+                app = self.make_app(latency=self.latency)
+                
+                def build_quiz():
+                    paths = [str(source)]
+                    documents = [(source.name, text) for text in app.read_files_budgeted(paths, app.INDEX_CHAR_BUDGET) if text]
+                    content = app.select_content(documents, None, app.PROMPT_TOKEN_BUDGET * app.shard_count(count))
+                    questions, _ = app.generate_question_set(content, count, 'medio')
+                    return questions
+                
+                self.measure(f"e2e.{source.suffix[1:]}.{count}q", build_quiz, questions_count=count)
+                app.extractor.close()
+    
+    def run(self) -> Dict:
+        self.bench_pdf_extraction()
+        self.bench_text_extraction()
+        self.bench_parsing()
+        self.bench_end_to_end()
+        
+        return {
+            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'version': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeats': self.repeats,
+            'latency': self.latency,
+            'results': self.results
+        }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict):
+    previous = {result['benchmark']: result for result in baseline.get('results', [])}
+    
+    print(f"\n{Colors.BOLD}📊 Comparación con {baseline.get('version') or 'referencia'} ({baseline.get('fecha')}){Colors.ENDC}")
+    
+    for result in current['results']:
+        old = previous.get(result['benchmark'])
+        if old is None or not old['seconds_median']:
+            continue
+        
+        change = (result['seconds_median'] - old['seconds_median']) / old['seconds_median'] * 100
+        color = Colors.GREEN if change < -5 else Colors.RED if change > 5 else Colors.YELLOW
+        print(f"  {result['benchmark']:<40} {old['seconds_median'] * 1000:10.2f} ms → "
+              f"{result['seconds_median'] * 1000:10.2f} ms  {color}{change:+6.1f}%{Colors.ENDC}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks sin conexión de QuadraTurbo")
+    parser.add_argument('--output', default='bench_results.json', help="Archivo JSON de resultados")
+    parser.add_argument('--compare', metavar='JSON', help="Resultados anteriores con los que comparar")
+    parser.add_argument('--repeats', type=int, default=3, help="Repeticiones por prueba (se usa la mediana)")
+    parser.add_argument('--latency', type=float, default=0.5, help="Latencia simulada por llamada de la API falsa")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos para la extracción de PDF")
+    parser.add_argument('--responses', metavar='JSON', help="Respuestas grabadas para la API falsa (lista JSON de textos)")
+    parser.add_argument('--quick', action='store_true', help="Tamaños reducidos para una ejecución rápida")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    
+    with tempfile.TemporaryDirectory(prefix='quadraturbo-bench-') as workdir:
+        suite = BenchmarkSuite(Path(workdir), args.repeats, args.latency, args.quick, args.workers, args.responses)
+        report = suite.run()
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n{Colors.GREEN}✓ Resultados guardados en {args.output}{Colors.ENDC}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,69 @@
 #!/usr/bin/env python3
 
+import time
+
+STARTED_AT = time.perf_counter()
+
+import io
 import os
 import sys
 import json
-import time
+import importlib
 import re
+import math
+import mmap
+import codecs
+import itertools
+import hashlib
+import argparse
+import queue
+import threading
+import sqlite3
+import random
+from array import array
+from types import SimpleNamespace
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator, Callable
 
 try:
-    import PyPDF2
+    import fcntl
 except ImportError:
-    PyPDF2 = None
+    fcntl = None
 
 try:
-    import anthropic
+    import msvcrt
 except ImportError:
-    anthropic = None
+    msvcrt = None
+
+LAZY_IMPORTS: Dict[str, Optional[float]] = {}
+LAZY_MODULES: Dict[str, object] = {}
+
+
+def optional_import(name: str):
+    if name not in LAZY_MODULES:
+        start = time.perf_counter()
+        try:
+            LAZY_MODULES[name] = importlib.import_module(name)
+            LAZY_IMPORTS[name] = (time.perf_counter() - start) * 1000
+        except ImportError:
+            LAZY_MODULES[name] = None
+            LAZY_IMPORTS[name] = None
+    return LAZY_MODULES[name]
+
+
+def process_uptime() -> Optional[float]:
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
 
 
 class Colors:
@@ -32,533 +78,3821 @@ class Colors:
     UNDERLINE = '\033[4m'
 
 
-class QuadraTurboTest:
+class ExtractionCache:
     
-    BANNER = f"""{Colors.CYAN}
-    ██████╗ ██╗   ██╗ █████╗ ██████╗ ██████╗  █████╗ ████████╗██╗   ██╗██████╗ ██████╗  ██████╗ 
-   ██╔═══██╗██║   ██║██╔══██╗██╔══██╗██╔══██╗██╔══██╗╚══██╔══╝██║   ██║██╔══██╗██╔══██╗██╔═══██╗
-   ██║   ██║██║   ██║███████║██║  ██║██████╔╝███████║   ██║   ██║   ██║██████╔╝██████╔╝██║   ██║
-   ██║▄▄ ██║██║   ██║██╔══██║██║  ██║██╔══██╗██╔══██║   ██║   ██║   ██║██╔══██╗██╔══██╗██║   ██║
-   ╚██████╔╝╚██████╔╝██║  ██║██████╔╝██║  ██║██║  ██║   ██║   ╚██████╔╝██║  ██║██████╔╝╚██████╔╝
-    ╚══▀▀═╝  ╚═════╝ ╚═╝  ╚═╝╚═════╝ ╚═╝  ╚═╝╚═╝  ╚═╝   ╚═╝    ╚═════╝ ╚═╝  ╚═╝╚═════╝  ╚═════╝ 
-{Colors.ENDC}
-{Colors.BOLD}                           Sistema Generador de Tests Inteligente{Colors.ENDC}
-{Colors.YELLOW}                                    powered by Claude AI{Colors.ENDC}
-"""
+    EXTRACTOR_VERSION = '3'
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
     
-    def __init__(self):
-        self.questions: List[Dict] = []
-        self.answers: List[int] = []
-        self.results_history: List[Dict] = []
-        self.api_key = os.environ.get('ANTHROPIC_API_KEY', '')
-        self.client = None
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / '.quadraturbo_cache'
+        self.index_file = self.cache_dir / 'index.json'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.index: Dict[str, Dict] = self._load_index()
         
-    def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            return index if isinstance(index, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    def _write_atomic(self, path: Path, data: bytes):
+        import tempfile
         
-    def print_banner(self):
-        self.clear_screen()
-        print(self.BANNER)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, prefix=f'{path.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+            raise
+    
+    def _save_index(self):
+        self._write_atomic(self.index_file, json.dumps(self.index).encode('utf-8'))
+    
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt"
+    
+    def file_key(self, path: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{self.EXTRACTOR_VERSION}:{Path(path).suffix.lower()}:".encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[List[str], bool]]:
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
         
-    def validate_file_path(self, path: str) -> Tuple[bool, str]:
-        if not path or path.strip() == '':
-            return False, "Ruta vacía"
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                pages = json.load(f)
+            if not isinstance(pages, list) or len(pages) != entry.get('pages'):
+                raise ValueError("Entrada de caché inconsistente")
+        except (OSError, ValueError):
+            with self.lock:
+                self.index.pop(key, None)
+                self.misses += 1
+            return None
         
-        path = path.strip().strip('"').strip("'")
+        with self.lock:
+            entry['accessed'] = time.time()
+            self.hits += 1
+            
+            try:
+                self._save_index()
+            except OSError:
+                pass
         
-        if not os.path.exists(path):
-            return False, f"El archivo no existe: {path}"
+        return pages, entry.get('complete', True)
+    
+    def put(self, key: str, pages: List[str], complete: bool = True):
+        data = json.dumps(pages, ensure_ascii=False).encode('utf-8')
         
-        if not os.path.isfile(path):
-            return False, f"La ruta no es un archivo: {path}"
+        if len(data) > self.max_bytes:
+            return
         
-        ext = Path(path).suffix.lower()
-        if ext not in ['.pdf', '.txt', '.md']:
-            return False, f"Extensión no soportada: {ext}. Use .pdf, .txt o .md"
+        self._write_atomic(self._entry_path(key), data)
         
-        if not os.access(path, os.R_OK):
-            return False, f"No hay permisos de lectura: {path}"
+        with self.lock:
+            self.index[key] = {'size': len(data), 'accessed': time.time(), 'pages': len(pages), 'complete': complete}
+            self._evict()
+            self._save_index()
+    
+    def _evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
         
-        return True, path
+        for key in sorted(self.index, key=lambda k: self.index[k]['accessed']):
+            if total <= self.max_bytes:
+                break
+            
+            total -= self.index.pop(key)['size']
+            self.evictions += 1
+            
+            try:
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
     
-    def read_txt_file(self, path: str) -> Optional[str]:
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+    def invalidate(self, path: str) -> bool:
+        try:
+            key = self.file_key(path)
+        except OSError:
+            return False
         
-        for encoding in encodings:
+        with self.lock:
+            if self.index.pop(key, None) is None:
+                return False
+            
             try:
-                with open(path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                    if content.strip():
-                        return content
-            except (UnicodeDecodeError, Exception):
-                continue
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
+            
+            self._save_index()
+            return True
+    
+    def clear(self):
+        with self.lock:
+            for key in list(self.index):
+                try:
+                    self._entry_path(key).unlink()
+                except OSError:
+                    pass
+            
+            self.index = {}
+            self._save_index()
+    
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self.index),
+                'bytes': sum(entry['size'] for entry in self.index.values()),
+                'max_bytes': self.max_bytes
+            }
+
+
+def count_pdf_pages(path: str) -> int:
+    with open(path, 'rb') as f:
+        return len(optional_import('PyPDF2').PdfReader(f).pages)
+
+
+def extract_pdf_range(path: str, start: int, end: int) -> List[str]:
+    with open(path, 'rb') as f:
+        reader = optional_import('PyPDF2').PdfReader(f)
+        return [reader.pages[i].extract_text() or '' for i in range(start, end)]
+
+
+class PdfPageStream:
+    
+    def __init__(self, pool: ProcessPoolExecutor, path: str, start: int, end: int, task_pages: int, window: int):
+        self.pool = pool
+        self.ranges = iter([(path, first, min(first + task_pages, end)) for first in range(start, end, task_pages)])
+        self.in_flight = deque(pool.submit(extract_pdf_range, *task) for task in itertools.islice(self.ranges, window))
+        self.pages = deque()
+    
+    def __iter__(self) -> 'PdfPageStream':
+        return self
+    
+    def __next__(self) -> str:
+        while not self.pages:
+            if not self.in_flight:
+                raise StopIteration
+            
+            pages = self.in_flight.popleft().result()
+            
+            task = next(self.ranges, None)
+            if task is not None:
+                self.in_flight.append(self.pool.submit(extract_pdf_range, *task))
+            
+            self.pages.extend(pages)
         
-        return None
+        return self.pages.popleft()
+    
+    def close(self):
+        for future in self.in_flight:
+            future.cancel()
+        
+        self.in_flight.clear()
+        self.ranges = iter(())
+
+
+class ParallelExtractor:
     
-    def read_md_file(self, path: str) -> Optional[str]:
-        return self.read_txt_file(path)
+    MIN_PARALLEL_PAGES = 64
+    MIN_PAGES_PER_TASK = 32
     
-    def read_pdf_file(self, path: str) -> Optional[str]:
-        if PyPDF2 is None:
-            print(f"{Colors.RED}Error: PyPDF2 no instalado. Instala con: pip install PyPDF2{Colors.ENDC}")
-            return None
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or self.available_cpus())
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.pool_lock = threading.Lock()
+        
+    @staticmethod
+    def available_cpus() -> int:
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0)) or 1
+        return os.cpu_count() or 1
+    
+    def should_parallelize(self, total_pages: int) -> bool:
+        return self.workers > 1 and total_pages >= self.MIN_PARALLEL_PAGES
+    
+    def get_pool(self) -> ProcessPoolExecutor:
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self.pool
+    
+    def close(self):
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+    
+    def iter_pdf_pages(self, path: str, start: int, end: int) -> Iterator[str]:
+        with open(path, 'rb') as f:
+            reader = optional_import('PyPDF2').PdfReader(f)
+            for i in range(start, end):
+                yield reader.pages[i].extract_text() or ''
+    
+    def open_pdfs(self, starts: Dict[str, int]) -> Tuple[Dict[str, Iterator[str]], Dict[str, str]]:
+        errors: Dict[str, str] = {}
+        page_counts: Dict[str, int] = {}
+        
+        for path in starts:
+            try:
+                page_counts[path] = count_pdf_pages(path)
+            except Exception as e:
+                errors[path] = str(e)
+        
+        if not self.should_parallelize(sum(count - starts[path] for path, count in page_counts.items())):
+            return {path: self.iter_pdf_pages(path, starts[path], count) for path, count in page_counts.items()}, errors
+        
+        pool = self.get_pool()
+        window = max(1, self.workers * 2 // len(page_counts))
+        
+        return {path: PdfPageStream(pool, path, starts[path], count, self.MIN_PAGES_PER_TASK, window)
+                for path, count in page_counts.items()}, errors
+
+
+class TextFileReader:
+    
+    SAMPLE_BYTES = 64 * 1024
+    CHUNK_BYTES = 256 * 1024
+    MMAP_THRESHOLD = 16 * 1024 * 1024
+    BOMS = [
+        (codecs.BOM_UTF32_LE, 'utf-32-le'),
+        (codecs.BOM_UTF32_BE, 'utf-32-be'),
+        (codecs.BOM_UTF8, 'utf-8'),
+        (codecs.BOM_UTF16_LE, 'utf-16-le'),
+        (codecs.BOM_UTF16_BE, 'utf-16-be')
+    ]
+    CP1252_BYTES = re.compile(rb'[\x80\x82-\x8c\x8e\x91-\x9c\x9e\x9f]')
+    
+    @classmethod
+    def detect_encoding(cls, sample: bytes) -> Tuple[str, int]:
+        for bom, encoding in cls.BOMS:
+            if sample.startswith(bom):
+                return encoding, len(bom)
         
         try:
-            with open(path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                
-                if len(reader.pages) == 0:
-                    return None
-                
-                content = ""
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        content += text + "\n"
-                
-                return content.strip() if content.strip() else None
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            return 'utf-8', 0
+        except UnicodeDecodeError:
+            pass
+        
+        return ('cp1252' if cls.CP1252_BYTES.search(sample) else 'latin-1'), 0
+    
+    @classmethod
+    @contextmanager
+    def open_bytes(cls, path: str):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= cls.MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    yield data
+            else:
+                yield f.read()
+    
+    @classmethod
+    def iter_chunks(cls, path: str) -> Iterator[str]:
+        with cls.open_bytes(path) as data:
+            encoding, offset = cls.detect_encoding(data[:cls.SAMPLE_BYTES])
+            decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors='replace'), True)
+            pending = ''
+            
+            for start in range(offset, len(data), cls.CHUNK_BYTES):
+                pending += decoder.decode(data[start:start + cls.CHUNK_BYTES])
+                cut = pending.rfind('\n')
+                if cut < 0:
+                    cut = pending.rfind(' ')
                 
-        except Exception as e:
-            print(f"{Colors.RED}Error leyendo PDF: {str(e)}{Colors.ENDC}")
-            return None
+                if cut >= 0:
+                    yield pending[:cut + 1]
+                    pending = pending[cut + 1:]
+            
+            pending += decoder.decode(b'', True)
+            if pending:
+                yield pending
+
+
+class ContentCompactor:
     
-    def read_file_content(self, path: str) -> Optional[str]:
-        ext = Path(path).suffix.lower()
+    CHARS_PER_TOKEN = 4
+    EDGE_LINES = 3
+    MIN_REPEATS = 3
+    REPEAT_RATIO = 0.5
+    MIN_KEPT = 0.5
+    TOKEN_PATTERN = re.compile(r'\w{1,4}|[^\w\s]')
+    PAGE_NUMBER = re.compile(r'(?:p[áa]g(?:ina)?\.?|page)?\s*[-–—]?\s*\d{1,4}\s*[-–—]?\s*(?:(?:/|de|of)\s*\d{1,4})?', re.IGNORECASE)
+    HYPHENATED = re.compile(r'(\w)[-\u00ad]\n([a-záéíóúüñ])')
+    SOFT_BREAK = re.compile(r'(?<=[^\s.:;!?])\n(?=[a-záéíóúüñ(])')
+    SPACES = re.compile(r'[ \t\f\v\u00a0\u2000-\u200b\u3000]+')
+    LINE_EDGES = re.compile(r' ?\n ?')
+    BLANK_LINES = re.compile(r'\n{3,}')
+    
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return len(cls.TOKEN_PATTERN.findall(text))
+    
+    @classmethod
+    def truncate(cls, text: str, budget: int) -> str:
+        match = next(itertools.islice(cls.TOKEN_PATTERN.finditer(text), budget, None), None)
+        return text if match is None else text[:match.start()].rstrip()
+    
+    @staticmethod
+    def signature(line: str) -> str:
+        return re.sub(r'\d+', '#', ' '.join(line.split()).lower())
+    
+    @classmethod
+    def edge_lines(cls, lines: List[str]) -> List[str]:
+        content = [line for line in lines if line.strip()]
+        return content[:cls.EDGE_LINES] + content[-cls.EDGE_LINES:]
+    
+    @classmethod
+    def boilerplate(cls, pages: List[List[str]]) -> set:
+        counts: Dict[str, int] = {}
         
-        if ext == '.pdf':
-            return self.read_pdf_file(path)
-        elif ext == '.txt':
-            return self.read_txt_file(path)
-        elif ext == '.md':
-            return self.read_md_file(path)
+        for lines in pages:
+            for signature in {cls.signature(line) for line in cls.edge_lines(lines)}:
+                counts[signature] = counts.get(signature, 0) + 1
         
-        return None
+        threshold = max(cls.MIN_REPEATS, len(pages) * cls.REPEAT_RATIO)
+        return {signature for signature, count in counts.items() if count >= threshold}
     
-    def get_file_paths(self) -> List[str]:
-        print(f"\n{Colors.BOLD}📁 Ingreso de Archivos{Colors.ENDC}")
-        print(f"{Colors.CYAN}Puedes ingresar múltiples archivos separados por comas{Colors.ENDC}")
-        print(f"{Colors.YELLOW}Formatos soportados: PDF, TXT, MD{Colors.ENDC}\n")
+    @classmethod
+    def is_boilerplate(cls, line: str, boilerplate: set) -> bool:
+        line = line.strip()
+        return not line or cls.PAGE_NUMBER.fullmatch(line) is not None or cls.signature(line) in boilerplate
+    
+    @classmethod
+    def strip_page(cls, lines: List[str], boilerplate: set) -> List[str]:
+        start, end = 0, len(lines)
         
-        while True:
-            user_input = input(f"{Colors.GREEN}Rutas de archivos: {Colors.ENDC}").strip()
+        for _ in range(cls.EDGE_LINES):
+            while start < end and not lines[start].strip():
+                start += 1
+            if start < end and cls.is_boilerplate(lines[start], boilerplate):
+                start += 1
+        
+        for _ in range(cls.EDGE_LINES):
+            while end > start and not lines[end - 1].strip():
+                end -= 1
+            if end > start and cls.is_boilerplate(lines[end - 1], boilerplate):
+                end -= 1
+        
+        return lines[start:end]
+    
+    @staticmethod
+    def size(pages: List[List[str]]) -> int:
+        return sum(len(line) for lines in pages for line in lines)
+    
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        text = cls.LINE_EDGES.sub('\n', cls.SPACES.sub(' ', text))
+        text = cls.BLANK_LINES.sub('\n\n', text)
+        text = cls.HYPHENATED.sub(r'\1\2', text)
+        text = cls.SOFT_BREAK.sub(' ', text)
+        return text.strip()
+    
+    @classmethod
+    def compact(cls, pages: List[str], paged: bool = True) -> str:
+        if not paged:
+            pages = [''.join(pages)]
+        
+        page_lines = [page.split('\n') for page in pages if page and page.strip()]
+        
+        if paged:
+            boilerplate = cls.boilerplate(page_lines) if len(page_lines) >= cls.MIN_REPEATS else set()
+            stripped = [cls.strip_page(lines, boilerplate) for lines in page_lines]
             
-            if not user_input:
-                print(f"{Colors.RED}⚠ Debes ingresar al menos un archivo{Colors.ENDC}")
+            if boilerplate and cls.size(stripped) < cls.size(page_lines) * cls.MIN_KEPT:
+                stripped = [cls.strip_page(lines, set()) for lines in page_lines]
+            page_lines = stripped
+        
+        return cls.normalize("\n".join("\n".join(lines) for lines in page_lines if lines))
+
+
+class ChunkIndex:
+    
+    VERSION = '2'
+    CHUNK_CHARS = 1200
+    K1 = 1.5
+    B = 0.75
+    DIVERSITY = 0.5
+    PROFILE_TERMS = 40
+    STOPWORDS = frozenset("""
+        que los las del por con una para como más pero sus este esta entre cuando muy sin sobre también
+        hasta hay donde quien desde todo nos durante todos uno les contra otros ese eso ante ellos esto
+        antes algunos unos otro otras otra tanto esa estos mucho cual poco ella estar estas algunas algo
+        son ser han fue era sido tiene puede pueden cada así solo sólo bien según the and for are but not
+        you all any can had her was one our out has have with this that from they were which their will
+        would there been into more other than then them these some what when who also its may such only
+    """.split())
+    
+    def __init__(self):
+        self.chunks: List[Dict] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        self.avg_length = 0.0
+        
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return [word for word in re.findall(r'\w+', text.lower())
+                if len(word) > 2 and not word.isdigit() and word not in cls.STOPWORDS]
+    
+    @classmethod
+    def split_passages(cls, text: str) -> List[str]:
+        passages = []
+        current: List[str] = []
+        size = 0
+        
+        for paragraph in re.split(r'\n\s*\n|\n(?=[A-ZÁÉÍÓÚÑ0-9•\-])', text):
+            paragraph = ' '.join(paragraph.split())
+            if not paragraph:
                 continue
             
-            paths = [p.strip() for p in user_input.split(',')]
-            valid_paths = []
+            while len(paragraph) > cls.CHUNK_CHARS:
+                cut = paragraph.rfind('. ', 0, cls.CHUNK_CHARS)
+                if cut < cls.CHUNK_CHARS // 2:
+                    cut = paragraph.rfind(' ', 0, cls.CHUNK_CHARS)
+                if cut <= 0:
+                    cut = cls.CHUNK_CHARS
+                if current:
+                    passages.append(' '.join(current))
+                    current, size = [], 0
+                passages.append(paragraph[:cut + 1].strip())
+                paragraph = paragraph[cut + 1:].strip()
             
-            for path in paths:
-                is_valid, result = self.validate_file_path(path)
-                if is_valid:
-                    valid_paths.append(result)
-                    print(f"{Colors.GREEN}✓ Archivo válido: {Path(result).name}{Colors.ENDC}")
-                else:
-                    print(f"{Colors.RED}✗ {result}{Colors.ENDC}")
+            if size + len(paragraph) > cls.CHUNK_CHARS and current:
+                passages.append(' '.join(current))
+                current, size = [], 0
             
-            if valid_paths:
-                return valid_paths
-            else:
-                print(f"{Colors.RED}⚠ No se encontraron archivos válidos. Intenta nuevamente.{Colors.ENDC}\n")
-    
-    def get_question_count(self) -> int:
-        print(f"\n{Colors.BOLD}❓ Configuración del Test{Colors.ENDC}")
+            if paragraph:
+                current.append(paragraph)
+                size += len(paragraph) + 1
         
-        while True:
-            try:
-                count = input(f"{Colors.GREEN}Cantidad de preguntas a generar (1-50): {Colors.ENDC}").strip()
-                
-                if not count:
-                    print(f"{Colors.RED}⚠ Debes ingresar un número{Colors.ENDC}")
-                    continue
-                
-                count = int(count)
-                
-                if count < 1 or count > 50:
-                    print(f"{Colors.RED}⚠ El número debe estar entre 1 y 50{Colors.ENDC}")
-                    continue
-                
-                return count
-                
-            except ValueError:
-                print(f"{Colors.RED}⚠ Entrada inválida. Ingresa un número válido{Colors.ENDC}")
+        if current:
+            passages.append(' '.join(current))
+        
+        return passages
     
-    def get_difficulty(self) -> str:
-        print(f"\n{Colors.BOLD}🎯 Nivel de Dificultad{Colors.ENDC}")
-        print(f"{Colors.CYAN}1.{Colors.ENDC} Fácil")
-        print(f"{Colors.CYAN}2.{Colors.ENDC} Medio")
-        print(f"{Colors.CYAN}3.{Colors.ENDC} Difícil")
-        print(f"{Colors.CYAN}4.{Colors.ENDC} Mixto")
+    @classmethod
+    def build(cls, documents: List[Tuple[str, str]]) -> 'ChunkIndex':
+        index = cls()
         
-        while True:
-            choice = input(f"\n{Colors.GREEN}Selecciona dificultad (1-4): {Colors.ENDC}").strip()
+        for source, text in documents:
+            for position, passage in enumerate(cls.split_passages(text)):
+                index.chunks.append({'source': source, 'position': position, 'text': passage,
+                                     'tokens': ContentCompactor.estimate_tokens(passage)})
+        
+        for chunk_id, chunk in enumerate(index.chunks):
+            tokens = cls.tokenize(chunk['text'])
+            index.lengths.append(len(tokens))
             
-            if choice == '1':
-                return 'facil'
-            elif choice == '2':
-                return 'medio'
-            elif choice == '3':
-                return 'dificil'
-            elif choice == '4':
-                return 'mixto'
-            else:
-                print(f"{Colors.RED}⚠ Opción inválida{Colors.ENDC}")
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            
+            for term, tf in counts.items():
+                index.postings.setdefault(term, []).append((chunk_id, tf))
+        
+        index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+        return index
     
-    def initialize_api_client(self) -> bool:
-        if anthropic is None:
-            print(f"\n{Colors.RED}Error: Librería anthropic no instalada{Colors.ENDC}")
-            print(f"{Colors.YELLOW}Instala con: pip install anthropic{Colors.ENDC}")
-            return False
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.chunks) - df + 0.5) / (df + 0.5))
+    
+    def score(self, query_weights: Dict[str, float]) -> List[float]:
+        scores = [0.0] * len(self.chunks)
+        avg_length = self.avg_length or 1.0
         
-        if not self.api_key:
-            print(f"\n{Colors.YELLOW}⚠ No se encontró ANTHROPIC_API_KEY en variables de entorno{Colors.ENDC}")
-            self.api_key = input(f"{Colors.GREEN}Ingresa tu API Key de Anthropic: {Colors.ENDC}").strip()
+        for term, weight in query_weights.items():
+            idf = self.idf(term)
+            for chunk_id, tf in self.postings.get(term, ()):
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] += weight * idf * tf * (self.K1 + 1) / (tf + norm)
+        
+        return scores
+    
+    def profile(self) -> Dict[str, float]:
+        weights = {term: sum(tf for _, tf in postings) * self.idf(term)
+                   for term, postings in self.postings.items() if len(postings) > 1}
+        top = sorted(weights, key=weights.get, reverse=True)[:self.PROFILE_TERMS]
+        return {term: 1.0 for term in top}
+    
+    def select(self, budget: int, query: Optional[str] = None) -> List[int]:
+        if not self.chunks:
+            return []
+        
+        query_weights = {term: 1.0 for term in self.tokenize(query)} if query else {}
+        relevance = self.score(query_weights) if query_weights else []
+        
+        if not any(relevance):
+            query_weights = {}
+            relevance = self.score(self.profile())
+        
+        top = max(relevance) or 1.0
+        relevance = [value / top for value in relevance]
+        
+        average_size = sum(chunk['tokens'] for chunk in self.chunks) / len(self.chunks)
+        slots = max(1, int(budget // (average_size + 1)))
+        
+        if query_weights:
+            ranked = sorted(range(len(self.chunks)), key=lambda i: relevance[i], reverse=True)
+            pools = [[i for i in ranked[:slots * 5] if relevance[i] > 0]] * slots
+        else:
+            step = len(self.chunks) / min(slots, len(self.chunks))
+            pools = [list(range(int(s * step), max(int(s * step) + 1, int((s + 1) * step))))
+                     for s in range(min(slots, len(self.chunks)))]
+        
+        selected: List[int] = []
+        selected_terms: List[set] = []
+        term_sets: Dict[int, set] = {}
+        used = 0
+        
+        for pool in pools:
+            best, best_score, best_terms = None, None, None
             
-            if not self.api_key:
-                print(f"{Colors.RED}API Key requerida para generar preguntas{Colors.ENDC}")
-                return False
+            for chunk_id in pool:
+                if chunk_id in selected or used + self.chunks[chunk_id]['tokens'] > budget:
+                    continue
+                
+                if chunk_id not in term_sets:
+                    term_sets[chunk_id] = set(self.tokenize(self.chunks[chunk_id]['text']))
+                terms = term_sets[chunk_id]
+                redundancy = max((len(terms & other) / (len(terms | other) or 1) for other in selected_terms), default=0.0)
+                value = relevance[chunk_id] - self.DIVERSITY * redundancy
+                
+                if best_score is None or value > best_score:
+                    best, best_score, best_terms = chunk_id, value, terms
+            
+            if best is None:
+                continue
+            
+            selected.append(best)
+            selected_terms.append(best_terms)
+            used += self.chunks[best]['tokens'] + 1
         
-        try:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
-            return True
-        except Exception as e:
-            print(f"{Colors.RED}Error inicializando cliente: {str(e)}{Colors.ENDC}")
-            return False
+        return sorted(selected)
     
-    def generate_questions(self, content: str, count: int, difficulty: str) -> bool:
-        if not self.initialize_api_client():
-            return False
+    def render(self, chunk_ids: List[int]) -> str:
+        parts = []
+        current_source = None
         
-        print(f"\n{Colors.CYAN}🤖 Generando {count} preguntas con IA...{Colors.ENDC}")
+        for chunk_id in chunk_ids:
+            chunk = self.chunks[chunk_id]
+            if chunk['source'] != current_source:
+                current_source = chunk['source']
+                parts.append(f"[{current_source}]")
+            parts.append(chunk['text'])
         
-        difficulty_map = {
-            'facil': 'básico, conceptos fundamentales',
-            'medio': 'intermedio, requiere comprensión',
-            'dificil': 'avanzado, análisis profundo',
-            'mixto': 'variado, mezclando todos los niveles'
+        return "\n\n".join(parts)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'version': self.VERSION,
+            'chunks': self.chunks,
+            'lengths': self.lengths,
+            'postings': self.postings
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ChunkIndex':
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"Versión de índice incompatible: {data.get('version')}")
         
-        prompt = f"""Analiza el siguiente contenido y genera exactamente {count} preguntas de opción múltiple de nivel {difficulty_map[difficulty]}.
-
-CONTENIDO:
-{content[:15000]}
+        index = cls()
+        index.chunks = data['chunks']
+        index.lengths = data['lengths']
+        index.postings = {term: [tuple(p) for p in postings] for term, postings in data['postings'].items()}
+        index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+        return index
 
-INSTRUCCIONES CRÍTICAS:
-1. Genera EXACTAMENTE {count} preguntas relevantes sobre el contenido
-2. Cada pregunta debe tener 4 opciones (A, B, C, D)
-3. Solo UNA opción es correcta
-4. Las opciones incorrectas deben ser plausibles pero claramente incorrectas
-5. Varía la posición de la respuesta correcta
-6. Incluye una explicación breve de por qué la respuesta es correcta
 
-FORMATO JSON ESTRICTO:
-{{
-  "preguntas": [
-    {{
-      "pregunta": "¿Texto de la pregunta?",
-      "opciones": {{
-        "A": "Primera opción",
-        "B": "Segunda opción",
-        "C": "Tercera opción",
-        "D": "Cuarta opción"
-      }},
-      "respuesta_correcta": "A",
-      "explicacion": "Explicación de por qué A es correcta"
-    }}
-  ]
-}}
-
-Responde ÚNICAMENTE con el JSON, sin texto adicional."""
-
-        try:
-            message = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=8000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            response_text = message.content[0].text.strip()
-            
-            response_text = re.sub(r'^```json\s*', '', response_text)
-            response_text = re.sub(r'\s*```$', '', response_text)
-            response_text = response_text.strip()
-            
-            data = json.loads(response_text)
-            
-            if 'preguntas' not in data or not isinstance(data['preguntas'], list):
-                print(f"{Colors.RED}Error: Formato de respuesta inválido{Colors.ENDC}")
-                return False
-            
-            self.questions = data['preguntas']
-            
-            if len(self.questions) != count:
-                print(f"{Colors.YELLOW}⚠ Se generaron {len(self.questions)} preguntas (esperadas: {count}){Colors.ENDC}")
+class QuestionStreamParser:
+    
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escaped = False
+        self.object_start: Optional[int] = None
+        
+    def feed(self, text: str) -> List[Dict]:
+        self.buffer += text
+        found = []
+        
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
             
-            for i, q in enumerate(self.questions):
-                if not all(key in q for key in ['pregunta', 'opciones', 'respuesta_correcta']):
-                    print(f"{Colors.RED}Error: Pregunta {i+1} con formato incorrecto{Colors.ENDC}")
-                    return False
-                
-                if not isinstance(q['opciones'], dict) or len(q['opciones']) != 4:
-                    print(f"{Colors.RED}Error: Pregunta {i+1} no tiene 4 opciones{Colors.ENDC}")
-                    return False
-                
-                if q['respuesta_correcta'] not in q['opciones']:
-                    print(f"{Colors.RED}Error: Respuesta correcta inválida en pregunta {i+1}{Colors.ENDC}")
-                    return False
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if char == '{' and self.stack == ['{', '[']:
+                    self.object_start = self.position
+                self.stack.append(char)
+            elif char in '}]' and self.stack:
+                self.stack.pop()
+                if char == '}' and self.stack == ['{', '['] and self.object_start is not None:
+                    try:
+                        found.append(json.loads(self.buffer[self.object_start:self.position + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self.buffer = self.buffer[self.position + 1:]
+                    self.position = -1
+                    self.object_start = None
             
-            print(f"{Colors.GREEN}✓ {len(self.questions)} preguntas generadas exitosamente{Colors.ENDC}")
+            self.position += 1
+        
+        if self.object_start is None and not self.in_string:
+            self.buffer = ''
+            self.position = 0
+        
+        return found
+
+
+class MinHash:
+    
+    PERMUTATIONS = 64
+    BANDS = 16
+    THRESHOLD = 0.6
+    PRIME = (1 << 61) - 1
+    MASK = 0xFFFFFFFF
+    SEED = 1729
+    coefficients_cache: List[Tuple[int, int]] = []
+    
+    @classmethod
+    def coefficients(cls) -> List[Tuple[int, int]]:
+        if not cls.coefficients_cache:
+            rng = random.Random(cls.SEED)
+            cls.coefficients_cache = [(rng.randrange(1, cls.PRIME), rng.randrange(0, cls.PRIME))
+                                      for _ in range(cls.PERMUTATIONS)]
+        return cls.coefficients_cache
+    
+    @staticmethod
+    def shingles(question: Dict) -> set:
+        options = question.get('opciones')
+        values = sorted(str(value) for value in options.values()) if isinstance(options, dict) else []
+        text = ' '.join([str(question.get('pregunta', ''))] + values).lower()
+        tokens = [word for word in re.findall(r'\w+', text) if word not in ChunkIndex.STOPWORDS]
+        
+        if len(tokens) < 2:
+            return set(tokens) or {text}
+        return {f"{first} {second}" for first, second in zip(tokens, tokens[1:])}
+    
+    @classmethod
+    def signature(cls, question: Dict) -> List[int]:
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+                  for shingle in cls.shingles(question)]
+        return [min((a * value + b) % cls.PRIME for value in hashes) & cls.MASK for a, b in cls.coefficients()]
+    
+    @classmethod
+    def buckets(cls, signature: List[int]) -> List[int]:
+        rows = cls.PERMUTATIONS // cls.BANDS
+        return [int.from_bytes(hashlib.blake2b(bytes([band]) + cls.pack(signature[band * rows:(band + 1) * rows]),
+                                               digest_size=8).digest(), 'little', signed=True)
+                for band in range(cls.BANDS)]
+    
+    @staticmethod
+    def similarity(first: List[int], second: List[int]) -> float:
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+    
+    @staticmethod
+    def pack(signature: List[int]) -> bytes:
+        return array('I', signature).tobytes()
+    
+    @staticmethod
+    def unpack(data: bytes) -> List[int]:
+        return array('I', data).tolist()
+
+
+class QuestionDeduplicator:
+    
+    def __init__(self, bank: Optional['QuestionBank'] = None, doc_hash: Optional[str] = None,
+                 threshold: float = MinHash.THRESHOLD):
+        self.bank = bank
+        self.doc_hash = doc_hash
+        self.threshold = threshold
+        self.index: Dict[int, List[List[int]]] = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        
+    def is_duplicate(self, signature: List[int], buckets: List[int]) -> bool:
+        candidates = {id(other): other for bucket in buckets for other in self.index.get(bucket, [])}
+        if any(MinHash.similarity(signature, other) >= self.threshold for other in candidates.values()):
             return True
-            
-        except json.JSONDecodeError as e:
-            print(f"{Colors.RED}Error decodificando respuesta JSON: {str(e)}{Colors.ENDC}")
+        
+        if self.bank is None or not self.doc_hash:
             return False
-        except Exception as e:
-            print(f"{Colors.RED}Error generando preguntas: {str(e)}{Colors.ENDC}")
+        
+        try:
+            return self.bank.has_similar(self.doc_hash, signature, buckets, self.threshold)
+        except sqlite3.Error:
             return False
     
-    def run_test(self):
-        self.answers = []
-        start_time = time.time()
-        
-        print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
-        print(f"{Colors.BOLD}{Colors.CYAN}🎓 INICIANDO TEST{Colors.ENDC}")
-        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+    def accept(self, question: Dict) -> bool:
+        signature = MinHash.signature(question)
+        buckets = MinHash.buckets(signature)
         
-        for i, question in enumerate(self.questions, 1):
-            print(f"{Colors.BOLD}{Colors.BLUE}Pregunta {i}/{len(self.questions)}{Colors.ENDC}")
-            print(f"{Colors.YELLOW}{question['pregunta']}{Colors.ENDC}\n")
-            
-            for key in sorted(question['opciones'].keys()):
-                print(f"  {Colors.CYAN}{key}.{Colors.ENDC} {question['opciones'][key]}")
-            
-            while True:
-                answer = input(f"\n{Colors.GREEN}Tu respuesta (A/B/C/D) o 'salir': {Colors.ENDC}").strip().upper()
-                
-                if answer == 'SALIR':
-                    print(f"\n{Colors.YELLOW}Test cancelado por el usuario{Colors.ENDC}")
-                    return False
-                
-                if answer in question['opciones']:
-                    self.answers.append(answer)
-                    break
-                else:
-                    print(f"{Colors.RED}⚠ Respuesta inválida. Usa A, B, C o D{Colors.ENDC}")
+        with self.lock:
+            if self.is_duplicate(signature, buckets):
+                self.dropped += 1
+                return False
             
-            print(f"\n{Colors.BOLD}{'─'*80}{Colors.ENDC}\n")
+            for bucket in buckets:
+                self.index.setdefault(bucket, []).append(signature)
         
-        elapsed_time = time.time() - start_time
-        self.show_results(elapsed_time)
         return True
     
-    def show_results(self, elapsed_time: float):
-        self.clear_screen()
-        print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
-        print(f"{Colors.BOLD}{Colors.CYAN}📊 RESULTADOS DEL TEST{Colors.ENDC}")
-        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+    def filter(self, questions: List[Dict]) -> List[Dict]:
+        return [q for q in questions if self.accept(q)]
+
+
+class QuestionBank:
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            doc_hash TEXT NOT NULL,
+            difficulty TEXT NOT NULL,
+            chunk_hash TEXT NOT NULL,
+            question TEXT NOT NULL,
+            served INTEGER NOT NULL DEFAULT 0,
+            created REAL NOT NULL,
+            signature BLOB
+        );
+        CREATE TABLE IF NOT EXISTS question_buckets (
+            doc_hash TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            question_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_questions_lookup ON questions (doc_hash, difficulty, served);
+        CREATE INDEX IF NOT EXISTS idx_questions_chunk ON questions (doc_hash, chunk_hash);
+        CREATE INDEX IF NOT EXISTS idx_buckets_lookup ON question_buckets (doc_hash, bucket);
+    """
+    
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else Path.home() / '.quadraturbo_bank.db'
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
         
-        correct = 0
-        total = len(self.questions)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(questions)")}
+        if columns and 'signature' not in columns:
+            self.conn.execute("ALTER TABLE questions ADD COLUMN signature BLOB")
         
-        for i, (question, user_answer) in enumerate(zip(self.questions, self.answers), 1):
-            correct_answer = question['respuesta_correcta']
-            is_correct = user_answer == correct_answer
-            
-            if is_correct:
-                correct += 1
-                status = f"{Colors.GREEN}✓ CORRECTO{Colors.ENDC}"
-            else:
-                status = f"{Colors.RED}✗ INCORRECTO{Colors.ENDC}"
-            
-            print(f"{Colors.BOLD}Pregunta {i}:{Colors.ENDC} {question['pregunta']}")
-            print(f"Tu respuesta: {Colors.CYAN}{user_answer}{Colors.ENDC} | Correcta: {Colors.GREEN}{correct_answer}{Colors.ENDC} | {status}")
+        self.conn.executescript(self.SCHEMA)
+        self.indexed: set = set()
+        
+    @staticmethod
+    def content_hash(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def fetch(self, doc_hash: str, difficulty: str, count: int, served: Optional[set] = None) -> List[Dict]:
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT id, question FROM questions WHERE doc_hash = ? AND difficulty = ? "
+                "AND id NOT IN (SELECT value FROM json_each(?)) ORDER BY served, RANDOM() LIMIT ?",
+                (doc_hash, difficulty, json.dumps(sorted(served or ())), count)
+            ).fetchall()
             
-            if not is_correct and 'explicacion' in question:
-                print(f"{Colors.YELLOW}💡 {question['explicacion']}{Colors.ENDC}")
+            self.conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?",
+                                  [(row[0],) for row in rows])
             
-            print(f"{Colors.BOLD}{'─'*80}{Colors.ENDC}\n")
+            if served is not None:
+                served.update(row[0] for row in rows)
         
-        percentage = (correct / total) * 100
+        return [json.loads(row[1]) for row in rows]
+    
+    def store(self, doc_hash: str, difficulty: str, chunk_hash: str, questions: List[Dict],
+              served: Optional[set] = None):
+        now = time.time()
         
-        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}")
-        print(f"{Colors.BOLD}Preguntas correctas: {Colors.GREEN}{correct}/{total}{Colors.ENDC}")
-        print(f"{Colors.BOLD}Porcentaje: {self.get_grade_color(percentage)}{percentage:.1f}%{Colors.ENDC}")
-        print(f"{Colors.BOLD}Tiempo total: {Colors.CYAN}{self.format_time(elapsed_time)}{Colors.ENDC}")
-        print(f"{Colors.BOLD}Calificación: {self.get_grade_text(percentage)}{Colors.ENDC}")
-        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+        with self.lock, self.conn:
+            for q in questions:
+                cursor = self.conn.execute(
+                    "INSERT INTO questions (doc_hash, difficulty, chunk_hash, question, served, created) "
+                    "VALUES (?, ?, ?, ?, 1, ?)",
+                    (doc_hash, difficulty, chunk_hash, json.dumps(q, ensure_ascii=False), now)
+                )
+                self.index_question(cursor.lastrowid, doc_hash, q)
+                
+                if served is not None:
+                    served.add(cursor.lastrowid)
+    
+    def index_question(self, question_id: int, doc_hash: str, question: Dict):
+        signature = MinHash.signature(question)
+        self.conn.execute("UPDATE questions SET signature = ? WHERE id = ?", (MinHash.pack(signature), question_id))
+        self.conn.executemany("INSERT INTO question_buckets (doc_hash, bucket, question_id) VALUES (?, ?, ?)",
+                              [(doc_hash, bucket, question_id) for bucket in MinHash.buckets(signature)])
+    
+    def backfill(self, doc_hash: str):
+        if doc_hash in self.indexed:
+            return
         
-        self.save_result(correct, total, percentage, elapsed_time)
+        rows = self.conn.execute("SELECT id, question FROM questions WHERE doc_hash = ? AND signature IS NULL",
+                                 (doc_hash,)).fetchall()
+        with self.conn:
+            for question_id, text in rows:
+                self.index_question(question_id, doc_hash, json.loads(text))
+        
+        self.indexed.add(doc_hash)
     
-    def get_grade_color(self, percentage: float) -> str:
-        if percentage >= 90:
-            return Colors.GREEN
-        elif percentage >= 70:
-            return Colors.YELLOW
-        else:
-            return Colors.RED
+    def has_similar(self, doc_hash: str, signature: List[int], buckets: List[int], threshold: float) -> bool:
+        with self.lock:
+            self.backfill(doc_hash)
+            rows = self.conn.execute(
+                "SELECT DISTINCT q.signature FROM question_buckets b JOIN questions q ON q.id = b.question_id "
+                f"WHERE b.doc_hash = ? AND b.bucket IN ({', '.join('?' * len(buckets))})",
+                (doc_hash, *buckets)
+            ).fetchall()
+        
+        return any(MinHash.similarity(signature, MinHash.unpack(row[0])) >= threshold for row in rows if row[0])
     
-    def get_grade_text(self, percentage: float) -> str:
-        if percentage >= 90:
-            return f"{Colors.GREEN}EXCELENTE 🏆{Colors.ENDC}"
-        elif percentage >= 80:
-            return f"{Colors.GREEN}MUY BIEN 🌟{Colors.ENDC}"
-        elif percentage >= 70:
-            return f"{Colors.YELLOW}BIEN ✓{Colors.ENDC}"
-        elif percentage >= 60:
-            return f"{Colors.YELLOW}APROBADO{Colors.ENDC}"
-        else:
-            return f"{Colors.RED}NECESITAS ESTUDIAR MÁS 📚{Colors.ENDC}"
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+@contextmanager
+def locked_file(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
     
-    def format_time(self, seconds: float) -> str:
-        minutes = int(seconds // 60)
-        secs = int(seconds % 60)
-        return f"{minutes}m {secs}s"
+    with open(path, 'a+', encoding='utf-8') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class HistoryStore:
     
-    def save_result(self, correct: int, total: int, percentage: float, time: float):
-        result = {
-            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'correctas': correct,
-            'total': total,
-            'porcentaje': round(percentage, 2),
-            'tiempo': round(time, 2)
-        }
+    BLOCK_SIZE = 8192
+    STATS_VERSION = 1
+    ROLLING_WINDOW = 20
+    MAX_DOCUMENTS = 100
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else Path.home() / '.quadraturbo_history.jsonl'
+        self.meta_path = self.path.with_suffix('.meta')
+        self.legacy_path = self.path.with_suffix('.json')
         
-        self.results_history.append(result)
+        if self.legacy_path.exists():
+            self.migrate()
         
-        try:
-            history_file = Path.home() / '.quadraturbo_history.json'
+    @contextmanager
+    def locked(self):
+        with locked_file(self.meta_path) as f:
+            f.seek(0)
+            try:
+                meta = json.loads(f.read() or '{}')
+            except ValueError:
+                meta = {}
             
-            existing_history = []
-            if history_file.exists():
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    existing_history = json.load(f)
+            if 'count' not in meta:
+                meta['count'] = self._count_lines()
             
-            existing_history.append(result)
+            if meta.get('stats', {}).get('version') != self.STATS_VERSION:
+                meta['stats'] = self._scan_stats()
             
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_history, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            print(f"{Colors.YELLOW}⚠ No se pudo guardar el historial: {str(e)}{Colors.ENDC}")
+            original = json.dumps(meta, sort_keys=True)
+            yield meta
+            
+            if json.dumps(meta, sort_keys=True) != original:
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(meta, ensure_ascii=False))
+                f.flush()
     
-    def show_history(self):
+    def _count_lines(self) -> int:
+        try:
+            with open(self.path, 'rb') as f:
+                return sum(block.count(b'\n') for block in iter(lambda: f.read(1024 * 1024), b''))
+        except FileNotFoundError:
+            return 0
+    
+    def _scan_stats(self) -> Dict:
+        stats = self.empty_stats()
+        
         try:
-            history_file = Path.home() / '.quadraturbo_history.json'
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.update_stats(stats, json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        
+        return stats
+    
+    @classmethod
+    def empty_stats(cls) -> Dict:
+        return {'version': cls.STATS_VERSION, 'total': {}, 'recientes': [], 'por_mes': {}, 'por_dificultad': {}, 'por_documento': {}}
+    
+    @staticmethod
+    def accumulate(bucket: Dict, result: Dict) -> Dict:
+        bucket['tests'] = bucket.get('tests', 0) + 1
+        bucket['correctas'] = bucket.get('correctas', 0) + result['correctas']
+        bucket['preguntas'] = bucket.get('preguntas', 0) + result['total']
+        bucket['porcentaje'] = round(bucket.get('porcentaje', 0.0) + result['porcentaje'], 2)
+        bucket['tiempo'] = round(bucket.get('tiempo', 0.0) + result.get('tiempo', 0.0), 2)
+        bucket['mejor'] = max(bucket.get('mejor', 0.0), result['porcentaje'])
+        bucket['ultimo'] = result['fecha']
+        return bucket
+    
+    @classmethod
+    def update_stats(cls, stats: Dict, result: Dict):
+        cls.accumulate(stats['total'], result)
+        stats['recientes'] = (stats['recientes'] + [result['porcentaje']])[-cls.ROLLING_WINDOW:]
+        cls.accumulate(stats['por_mes'].setdefault(result['fecha'][:7], {}), result)
+        
+        if result.get('dificultad'):
+            cls.accumulate(stats['por_dificultad'].setdefault(result['dificultad'], {}), result)
+        
+        if result.get('documentos'):
+            documents = stats['por_documento']
+            cls.accumulate(documents.setdefault(' + '.join(sorted(result['documentos'])), {}), result)
             
-            if not history_file.exists():
-                print(f"\n{Colors.YELLOW}No hay historial previo{Colors.ENDC}")
-                return
+            if len(documents) > cls.MAX_DOCUMENTS:
+                del documents[min(documents, key=lambda name: documents[name]['ultimo'])]
+    
+    def migrate(self) -> int:
+        with self.locked() as meta:
+            if not self.legacy_path.exists():
+                return 0
             
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
             
-            if not history:
-                print(f"\n{Colors.YELLOW}El historial está vacío{Colors.ENDC}")
-                return
+            if not isinstance(legacy, list):
+                raise ValueError(f"Historial antiguo con formato inválido: {self.legacy_path}")
             
-            self.clear_screen()
-            print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
-            print(f"{Colors.BOLD}{Colors.CYAN}📈 HISTORIAL DE RESULTADOS{Colors.ENDC}")
-            print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+            existing = b''
+            if self.path.exists():
+                with open(self.path, 'rb') as f:
+                    existing = f.read()
             
-            for i, result in enumerate(history[-10:], 1):
-                percentage = result['porcentaje']
-                color = self.get_grade_color(percentage)
-                
-                print(f"{Colors.BOLD}Test #{i}{Colors.ENDC}")
-                print(f"Fecha: {Colors.CYAN}{result['fecha']}{Colors.ENDC}")
-                print(f"Resultado: {Colors.GREEN}{result['correctas']}/{result['total']}{Colors.ENDC} ({color}{percentage}%{Colors.ENDC})")
-                print(f"Tiempo: {Colors.CYAN}{self.format_time(result['tiempo'])}{Colors.ENDC}")
-                print(f"{Colors.BOLD}{'─'*80}{Colors.ENDC}\n")
+            tmp_file = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'wb') as f:
+                for result in legacy:
+                    f.write((json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8'))
+                f.write(existing)
             
-            if len(history) > 10:
-                print(f"{Colors.YELLOW}Mostrando últimos 10 resultados de {len(history)} totales{Colors.ENDC}\n")
-                
-        except Exception as e:
-            print(f"{Colors.RED}Error cargando historial: {str(e)}{Colors.ENDC}")
+            os.replace(tmp_file, self.path)
+            os.replace(self.legacy_path, self.legacy_path.with_suffix('.json.bak'))
+            meta['count'] = self._count_lines()
+            meta['stats'] = self._scan_stats()
+            return len(legacy)
     
-    def main_menu(self):
-        while True:
-            print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
-            print(f"{Colors.BOLD}{Colors.CYAN}MENÚ PRINCIPAL{Colors.ENDC}")
-            print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
-            print(f"{Colors.CYAN}1.{Colors.ENDC} Nuevo Test")
-            print(f"{Colors.CYAN}2.{Colors.ENDC} Ver Historial")
-            print(f"{Colors.CYAN}3.{Colors.ENDC} Salir")
-            
-            choice = input(f"\n{Colors.GREEN}Selecciona una opción (1-3): {Colors.ENDC}").strip()
+    def append(self, result: Dict):
+        line = (json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8')
+        
+        with self.locked() as meta:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
             
-            if choice == '1':
-                return True
-            elif choice == '2':
-                self.show_history()
-                input(f"\n{Colors.CYAN}Presiona Enter para continuar...{Colors.ENDC}")
-                self.clear_screen()
-                self.print_banner()
-            elif choice == '3':
-                print(f"\n{Colors.GREEN}¡Hasta luego! 👋{Colors.ENDC}\n")
-                return False
-            else:
-                print(f"{Colors.RED}⚠ Opción inválida{Colors.ENDC}")
+            meta['count'] += 1
+            self.update_stats(meta['stats'], result)
     
-    def run(self):
-        self.print_banner()
+    def tail(self, n: int) -> List[Dict]:
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
         
-        if not self.main_menu():
-            return
+        with f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            
+            while position > 0 and data.count(b'\n') <= n:
+                size = min(self.BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                data = f.read(size) + data
         
-        file_paths = self.get_file_paths()
+        lines = data.splitlines()
+        if position > 0:
+            lines = lines[1:]
         
-        print(f"\n{Colors.CYAN}📖 Leyendo archivos...{Colors.ENDC}")
+        entries = []
+        for line in lines[-n:] if n > 0 else []:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
         
-        all_content = []
-        for path in file_paths:
-            content = self.read_file_content(path)
-            if content:
-                all_content.append(content)
-                print(f"{Colors.GREEN}✓ Contenido extraído de: {Path(path).name}{Colors.ENDC}")
-            else:
-                print(f"{Colors.RED}✗ No se pudo leer: {Path(path).name}{Colors.ENDC}")
+        return entries
+    
+    def count(self) -> int:
+        with self.locked() as meta:
+            return meta['count']
+    
+    def stats(self) -> Dict:
+        with self.locked() as meta:
+            return meta['stats']
+
+
+class Tracer:
+    
+    def __init__(self, path: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled or path is not None
+        self.trace_id = os.urandom(16).hex()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.spans: List[Dict] = []
+        self.output = open(path, 'a', encoding='utf-8', buffering=1) if path else None
         
-        if not all_content:
-            print(f"\n{Colors.RED}Error: No se pudo extraer contenido de ningún archivo{Colors.ENDC}")
+    def current(self) -> Optional[Dict]:
+        stack = getattr(self.local, 'stack', None)
+        return stack[-1] if stack else None
+    
+    @contextmanager
+    def span(self, name: str, parent: Optional[Dict] = None, **attributes):
+        if not self.enabled:
+            yield {'attributes': {}}
             return
         
-        combined_content = "\n\n".join(all_content)
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
         
-        if len(combined_content) < 100:
-            print(f"\n{Colors.RED}Error: Contenido insuficiente para generar preguntas{Colors.ENDC}")
+        parent = parent or self.current()
+        record = {
+            'trace_id': self.trace_id,
+            'span_id': os.urandom(8).hex(),
+            'parent_span_id': parent.get('span_id') if parent else None,
+            'name': name,
+            'start_time_unix_nano': time.time_ns(),
+            'thread': threading.current_thread().name,
+            'status': 'OK',
+            'attributes': attributes
+        }
+        start = time.perf_counter()
+        self.local.stack.append(record)
+        
+        try:
+            yield record
+        except Exception as e:
+            record['status'] = 'ERROR'
+            record['attributes']['error'] = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            self.local.stack.pop()
+            elapsed = time.perf_counter() - start
+            record['end_time_unix_nano'] = record['start_time_unix_nano'] + int(elapsed * 1e9)
+            record['duration_ms'] = round(elapsed * 1000, 3)
+            self.finish(record)
+    
+    def annotate(self, **attributes):
+        record = self.current() if self.enabled else None
+        if record is not None:
+            record['attributes'].update(attributes)
+    
+    def add(self, key: str, amount: float = 1):
+        record = self.current() if self.enabled else None
+        if record is not None:
+            record['attributes'][key] = record['attributes'].get(key, 0) + amount
+    
+    def record_usage(self, message):
+        usage = getattr(message, 'usage', None)
+        if usage is None or not self.enabled:
             return
         
-        question_count = self.get_question_count()
-        difficulty = self.get_difficulty()
+        for field in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                self.add(field, value)
+    
+    def finish(self, record: Dict):
+        with self.lock:
+            self.spans.append(record)
+            if self.output is not None:
+                self.output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    
+    def summary(self) -> List[Dict]:
+        with self.lock:
+            spans = sorted(self.spans, key=lambda record: record['start_time_unix_nano'])
         
-        if not self.generate_questions(combined_content, question_count, difficulty):
-            print(f"\n{Colors.RED}No se pudieron generar las preguntas{Colors.ENDC}")
-            return
+        stages: Dict[str, Dict] = {}
+        for record in spans:
+            stage = stages.setdefault(record['name'], {'stage': record['name'], 'calls': 0, 'errors': 0,
+                                                       'total_ms': 0.0, 'max_ms': 0.0})
+            stage['calls'] += 1
+            stage['errors'] += record['status'] != 'OK'
+            stage['total_ms'] += record['duration_ms']
+            stage['max_ms'] = max(stage['max_ms'], record['duration_ms'])
         
-        input(f"\n{Colors.CYAN}Presiona Enter para comenzar el test...{Colors.ENDC}")
-        self.clear_screen()
+        return list(stages.values())
+    
+    def totals(self) -> Dict:
+        totals = {'input_tokens': 0, 'output_tokens': 0, 'cache_creation_input_tokens': 0,
+                  'cache_read_input_tokens': 0, 'retries': 0}
         
-        if self.run_test():
+        with self.lock:
+            for record in self.spans:
+                for key in totals:
+                    totals[key] += record['attributes'].get(key, 0)
+        
+        return totals
+    
+    def print_profile(self):
+        stages = self.summary()
+        if not stages:
+            return
+        
+        print(f"\n{Colors.BOLD}{Colors.CYAN}⏱  PERFIL POR ETAPAS{Colors.ENDC}")
+        print(f"{Colors.BOLD}{'Etapa':<24}{'Llamadas':>10}{'Total (s)':>12}{'Media (ms)':>12}{'Máx (ms)':>12}{Colors.ENDC}")
+        
+        for stage in stages:
+            errors = f" {Colors.RED}({stage['errors']} errores){Colors.ENDC}" if stage['errors'] else ""
+            print(f"{stage['stage']:<24}{stage['calls']:>10}{stage['total_ms'] / 1000:>12.3f}"
+                  f"{stage['total_ms'] / stage['calls']:>12.1f}{stage['max_ms']:>12.1f}{errors}")
+        
+        totals = self.totals()
+        print(f"{Colors.CYAN}Tokens: {totals['input_tokens']} entrada, {totals['output_tokens']} salida, "
+              f"{totals['cache_read_input_tokens']} leídos de caché, {totals['cache_creation_input_tokens']} escritos en caché · "
+              f"Reintentos: {totals['retries']}{Colors.ENDC}")
+    
+    def close(self):
+        with self.lock:
+            if self.output is not None:
+                self.output.close()
+                self.output = None
+
+
+class TokenBucket:
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self, amount: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        
+        with self.lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+    
+    def adjust(self, amount: float):
+        if self.rate <= 0:
+            return
+        
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RequestScheduler:
+    
+    RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+    THROTTLE_STATUS = {429, 529}
+    
+    def __init__(self, requests_per_minute: int = 50, tokens_per_minute: int = 30000, max_concurrency: int = 4,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 tracer: Optional[Tracer] = None):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.active = 0
+        self.successes = 0
+        self.tracer = tracer
+        self.stats = {
+            'requests': 0, 'retries': 0, 'throttled': 0, 'failures': 0,
+            'queue_depth': 0, 'max_queue_depth': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+            'input_tokens': 0, 'output_tokens': 0, 'cache_read_tokens': 0, 'cache_write_tokens': 0
+        }
+        
+    @staticmethod
+    def status_of(error: Exception) -> Optional[int]:
+        status = getattr(error, 'status_code', None)
+        if status is None and getattr(error, 'response', None) is not None:
+            status = getattr(error.response, 'status_code', None)
+        return status
+    
+    def is_retryable(self, error: Exception) -> bool:
+        status = self.status_of(error)
+        if status is not None:
+            return status in self.RETRYABLE_STATUS
+        
+        anthropic = sys.modules.get('anthropic')
+        if anthropic is not None:
+            return isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError))
+        
+        return isinstance(error, (ConnectionError, TimeoutError))
+    
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if not headers:
+            return None
+        
+        value = headers.get('retry-after-ms')
+        if value is not None:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        
+        value = headers.get('retry-after')
+        if value is None:
+            return None
+        
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                from email.utils import parsedate_to_datetime
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+    
+    def backoff(self, attempt: int, error: Exception) -> float:
+        delay = self.retry_after(error)
+        if delay is not None:
+            return min(self.max_delay, delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0):
+        start = time.monotonic()
+        
+        with self.condition:
+            self.stats['queue_depth'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.stats['queue_depth'])
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+            self.stats['queue_depth'] -= 1
+        
+        try:
+            delay = max(self.request_bucket.reserve(1), self.token_bucket.reserve(estimated_tokens))
+            if delay > 0:
+                time.sleep(delay)
+            
+            waited = time.monotonic() - start
+            with self.condition:
+                self.stats['wait_seconds'] += waited
+                self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], waited)
+            
+            if self.tracer is not None:
+                self.tracer.annotate(queue_wait_ms=round(waited * 1000, 3))
+            
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify()
+    
+    def on_success(self):
+        with self.condition:
+            self.stats['requests'] += 1
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self.successes = 0
+                self.condition.notify()
+    
+    def on_error(self, error: Exception):
+        with self.condition:
+            if self.status_of(error) in self.THROTTLE_STATUS:
+                self.stats['throttled'] += 1
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+    
+    def retry(self, func: Callable, *args, cancel: Optional[threading.Event] = None, **kwargs):
+        attempt = 0
+        
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    with self.condition:
+                        self.stats['failures'] += 1
+                    raise
+                
+                self.on_error(e)
+                with self.condition:
+                    self.stats['retries'] += 1
+                if self.tracer is not None:
+                    self.tracer.add('retries')
+                if cancel is not None:
+                    cancel.wait(self.backoff(attempt, e))
+                else:
+                    time.sleep(self.backoff(attempt, e))
+                attempt += 1
+                continue
+            
+            self.on_success()
+            return result
+    
+    def call(self, func: Callable, estimated_tokens: int = 0, cancel: Optional[threading.Event] = None, **kwargs):
+        with self.slot(estimated_tokens):
+            result = self.retry(func, cancel=cancel, **kwargs)
+        
+        self.record_usage(result, estimated_tokens)
+        return result
+    
+    def record_usage(self, message, estimated_tokens: int):
+        usage = getattr(message, 'usage', None)
+        counts = {}
+        for field, stat in (('input_tokens', 'input_tokens'), ('output_tokens', 'output_tokens'),
+                            ('cache_read_input_tokens', 'cache_read_tokens'),
+                            ('cache_creation_input_tokens', 'cache_write_tokens')):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                counts[stat] = value
+        
+        if 'input_tokens' in counts:
+            self.token_bucket.adjust(counts['input_tokens'] + counts.get('cache_write_tokens', 0) - estimated_tokens)
+        
+        with self.condition:
+            for stat, value in counts.items():
+                self.stats[stat] += value
+        
+        if self.tracer is not None:
+            self.tracer.record_usage(message)
+    
+    def metrics(self) -> Dict:
+        with self.condition:
+            metrics = dict(self.stats)
+            metrics['active'] = self.active
+            metrics['concurrency_limit'] = self.limit
+        
+        calls = metrics['requests'] + metrics['failures']
+        metrics['avg_wait_seconds'] = round(metrics['wait_seconds'] / calls, 3) if calls else 0.0
+        metrics['wait_seconds'] = round(metrics['wait_seconds'], 3)
+        metrics['max_wait_seconds'] = round(metrics['max_wait_seconds'], 3)
+        return metrics
+
+
+class FakeAnthropicClient:
+    
+    class Messages:
+        
+        MIN_CACHE_TOKENS = 1024
+        
+        def __init__(self, latency: float, chunk_size: int, responses: Optional[List[str]] = None):
+            self.latency = latency
+            self.chunk_size = chunk_size
+            self.responses = responses or []
+            self.calls = 0
+            self.cached: set = set()
+            self.lock = threading.Lock()
+            
+        @staticmethod
+        def prompt_text(messages: List[Dict]) -> str:
+            content = messages[-1]['content']
+            if isinstance(content, str):
+                return content
+            return ''.join(block.get('text', '') for block in content)
+        
+        def usage(self, messages: List[Dict], text: str) -> SimpleNamespace:
+            prompt = self.prompt_text(messages)
+            content = messages[-1]['content']
+            cached = written = 0
+            
+            if not isinstance(content, str):
+                prefix = ''
+                for block in content:
+                    prefix += block.get('text', '')
+                    if 'cache_control' in block and len(prefix) // 4 >= self.MIN_CACHE_TOKENS:
+                        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+                        with self.lock:
+                            hit = key in self.cached
+                            self.cached.add(key)
+                        cached, written = (len(prefix) // 4, 0) if hit else (0, len(prefix) // 4)
+            
+            return SimpleNamespace(input_tokens=len(prompt) // 4 - cached - written, output_tokens=len(text) // 4,
+                                   cache_read_input_tokens=cached, cache_creation_input_tokens=written)
+        
+        def build_questions(self, prompt: str) -> List[Dict]:
+            match = re.search(r'genera exactamente (\d+)', prompt)
+            count = int(match.group(1)) if match else 5
+            
+            body = prompt.split('CONTENIDO:', 1)[-1].split('INSTRUCCIONES CRÍTICAS:', 1)[0]
+            sentences = [sentence.strip() for sentence in re.split(r'(?<=[.!?])\s+', body) if len(sentence.split()) >= 6]
+            words = sorted({word for word in re.findall(r'\w+', body) if len(word) > 4}) or ['alfa', 'beta', 'gamma', 'delta', 'epsilon']
+            rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+            
+            questions = []
+            for i in range(count):
+                sentence = sentences[i % len(sentences)] if sentences else f"Concepto {i+1} del contenido."
+                candidates = [word for word in re.findall(r'\w+', sentence) if len(word) > 4] or [rng.choice(words)]
+                answer = rng.choice(candidates)
+                distractors = [word for word in rng.sample(words, min(len(words), 6)) if word != answer][:3]
+                while len(distractors) < 3:
+                    distractors.append(f"{answer}{len(distractors) + 1}")
+                
+                options = distractors + [answer]
+                rng.shuffle(options)
+                letters = ['A', 'B', 'C', 'D']
+                
+                questions.append({
+                    'pregunta': f"¿Qué término completa la frase? \"{sentence.replace(answer, '____', 1)[:200]}\"",
+                    'opciones': dict(zip(letters, options)),
+                    'respuesta_correcta': letters[options.index(answer)],
+                    'explicacion': f"La frase original dice: \"{sentence[:200]}\""
+                })
+            
+            return questions
+        
+        def respond(self, kwargs: Dict) -> SimpleNamespace:
+            with self.lock:
+                call = self.calls
+                self.calls += 1
+            
+            time.sleep(self.latency)
+            prompt = self.prompt_text(kwargs['messages'])
+            
+            if self.responses:
+                text = self.responses[call % len(self.responses)]
+            else:
+                text = "```json\n" + json.dumps({'preguntas': self.build_questions(prompt)}, ensure_ascii=False, indent=2) + "\n```"
+            
+            return SimpleNamespace(
+                content=[SimpleNamespace(type='text', text=text)],
+                usage=self.usage(kwargs['messages'], text),
+                stop_reason='end_turn'
+            )
+        
+        def create(self, **kwargs) -> SimpleNamespace:
+            return self.respond(kwargs)
+        
+        @contextmanager
+        def stream(self, **kwargs):
+            message = self.respond(kwargs)
+            text = message.content[0].text
+            chunk_size = self.chunk_size
+            
+            def text_stream() -> Iterator[str]:
+                for start in range(0, len(text), chunk_size):
+                    yield text[start:start + chunk_size]
+            
+            yield SimpleNamespace(text_stream=text_stream(), get_final_message=lambda: message)
+    
+    def __init__(self, latency: float = 0.0, chunk_size: int = 64, responses: Optional[List[str]] = None):
+        self.messages = self.Messages(latency, chunk_size, responses)
+    
+    @classmethod
+    def from_recording(cls, path: str, latency: float = 0.0) -> 'FakeAnthropicClient':
+        with open(path, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+        
+        if not isinstance(responses, list) or not all(isinstance(text, str) for text in responses):
+            raise ValueError("La grabación debe ser una lista JSON de textos de respuesta")
+        
+        return cls(latency, responses=responses)
+
+
+def iter_completed(func: Callable, items: List, workers: int) -> Iterator[Tuple[object, object, Optional[Exception]]]:
+    tasks: queue.Queue = queue.Queue()
+    done: queue.Queue = queue.Queue()
+    for item in items:
+        tasks.put(item)
+    
+    def worker():
+        while True:
+            try:
+                item = tasks.get_nowait()
+            except queue.Empty:
+                return
+            
+            try:
+                done.put((item, func(item), None))
+            except Exception as e:
+                done.put((item, None, e))
+    
+    for _ in range(min(max(1, workers), len(items))):
+        threading.Thread(target=worker, daemon=True).start()
+    
+    for _ in items:
+        yield done.get()
+
+
+class QuizPrefetcher:
+    
+    def __init__(self, max_in_flight: int = 1):
+        self.max_in_flight = max(1, max_in_flight)
+        self.jobs: Dict[Tuple, Tuple[Future, threading.Event]] = {}
+        self.lock = threading.Lock()
+        self.stats = {'started': 0, 'used': 0, 'cancelled': 0, 'rejected': 0}
+        
+    def start(self, key: Tuple, func: Callable[[threading.Event], object]) -> bool:
+        with self.lock:
+            if key in self.jobs or len(self.jobs) >= self.max_in_flight:
+                self.stats['rejected'] += 1
+                return False
+            
+            future: Future = Future()
+            cancel = threading.Event()
+            self.jobs[key] = (future, cancel)
+            self.stats['started'] += 1
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(cancel))
+            except BaseException as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=run, name='prefetch', daemon=True).start()
+        return True
+    
+    def ready(self, key: Tuple) -> Optional[bool]:
+        with self.lock:
+            job = self.jobs.get(key)
+        return job[0].done() if job is not None else None
+    
+    def take(self, key: Tuple):
+        with self.lock:
+            job = self.jobs.pop(key, None)
+        
+        if job is None:
+            return None
+        
+        try:
+            result = job[0].result()
+        except Exception:
+            return None
+        
+        with self.lock:
+            self.stats['used'] += 1
+        return result
+    
+    def cancel(self, keep: Optional[Tuple] = None):
+        with self.lock:
+            for key in [key for key in self.jobs if key != keep]:
+                future, cancel = self.jobs.pop(key)
+                cancel.set()
+                future.cancel()
+                self.stats['cancelled'] += 1
+    
+    def close(self):
+        self.cancel()
+
+
+class SessionWorkspace:
+    
+    def __init__(self, documents: List[Tuple[str, str]]):
+        self.documents = documents
+        self.selections: Dict[Tuple[str, int], str] = {}
+        self.bank_keys: Dict[str, str] = {}
+        self.served: set = set()
+        self.rounds = 0
+
+
+class QuadraTurboTest:
+    
+    PROMPT_TOKEN_BUDGET = 4000
+    INDEX_CHAR_BUDGET = 2000000
+    MAX_QUESTIONS = 200
+    QUESTIONS_PER_SHARD = 10
+    TOKENS_PER_QUESTION = 400
+    REPAIR_ATTEMPTS = 2
+    GRADE_BANDS = [
+        (90, 'EXCELENTE 🏆', Colors.GREEN),
+        (80, 'MUY BIEN 🌟', Colors.GREEN),
+        (70, 'BIEN ✓', Colors.YELLOW),
+        (60, 'APROBADO', Colors.YELLOW),
+        (0, 'NECESITAS ESTUDIAR MÁS 📚', Colors.RED)
+    ]
+    MODEL = "claude-sonnet-4-20250514"
+    DIFFICULTY_MAP = {
+        'facil': 'básico, conceptos fundamentales',
+        'medio': 'intermedio, requiere comprensión',
+        'dificil': 'avanzado, análisis profundo',
+        'mixto': 'variado, mezclando todos los niveles'
+    }
+    DIFFICULTY_LABELS = {'facil': 'Fácil', 'medio': 'Medio', 'dificil': 'Difícil', 'mixto': 'Mixto'}
+    
+    BANNER = f"""{Colors.CYAN}
+    ██████╗ ██╗   ██╗ █████╗ ██████╗ ██████╗  █████╗ ████████╗██╗   ██╗██████╗ ██████╗  ██████╗ 
+   ██╔═══██╗██║   ██║██╔══██╗██╔══██╗██╔══██╗██╔══██╗╚══██╔══╝██║   ██║██╔══██╗██╔══██╗██╔═══██╗
+   ██║   ██║██║   ██║███████║██║  ██║██████╔╝███████║   ██║   ██║   ██║██████╔╝██████╔╝██║   ██║
+   ██║▄▄ ██║██║   ██║██╔══██║██║  ██║██╔══██╗██╔══██║   ██║   ██║   ██║██╔══██╗██╔══██╗██║   ██║
+   ╚██████╔╝╚██████╔╝██║  ██║██████╔╝██║  ██║██║  ██║   ██║   ╚██████╔╝██║  ██║██████╔╝╚██████╔╝
+    ╚══▀▀═╝  ╚═════╝ ╚═╝  ╚═╝╚═════╝ ╚═╝  ╚═╝╚═╝  ╚═╝   ╚═╝    ╚═════╝ ╚═╝  ╚═╝╚═════╝  ╚═════╝ 
+{Colors.ENDC}
+{Colors.BOLD}                           Sistema Generador de Tests Inteligente{Colors.ENDC}
+{Colors.YELLOW}                                    powered by Claude AI{Colors.ENDC}
+"""
+    
+    def __init__(self, cache: Optional[ExtractionCache] = None, workers: Optional[int] = None, concurrency: int = 4,
+                 bank: Optional[QuestionBank] = None, history: Optional[HistoryStore] = None,
+                 scheduler: Optional[RequestScheduler] = None, tracer: Optional[Tracer] = None):
+        self.questions: List[Dict] = []
+        self.answers: List[int] = []
+        self.results_history: List[Dict] = []
+        self.result_context: Dict = {}
+        self.api_key = os.environ.get('ANTHROPIC_API_KEY', '')
+        self.client = None
+        self.cache = cache
+        self.extractor = ParallelExtractor(workers)
+        self.concurrency = max(1, concurrency)
+        self.bank = bank
+        self.history = history
+        self.tracer = tracer or Tracer(enabled=False)
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=self.concurrency, tracer=self.tracer)
+        self.stream_mode = False
+        self.compact = True
+        self.startup_report = False
+        self.prefetcher: Optional[QuizPrefetcher] = None
+        self.stream_cancel = threading.Event()
+        self.stream_produced: List[Dict] = []
+        self.stream_finished = threading.Event()
+        self.stream_errors: List[str] = []
+        
+    def clear_screen(self):
+        print("\033[H\033[2J\033[3J", end='', flush=True)
+        
+    def print_banner(self):
+        self.clear_screen()
+        print(self.BANNER)
+        
+    def print_startup_report(self):
+        uptime = process_uptime()
+        if uptime is not None:
+            elapsed, origin = uptime * 1000, "desde el inicio del proceso"
+        else:
+            elapsed, origin = (time.perf_counter() - STARTED_AT) * 1000, "desde la carga del módulo"
+        
+        print(f"{Colors.CYAN}⏱  Arranque: {elapsed:.1f} ms hasta el menú {origin} "
+              f"({time.process_time() * 1000:.1f} ms de CPU del proceso, {len(sys.modules)} módulos cargados){Colors.ENDC}")
+    
+    def print_import_report(self):
+        if not LAZY_IMPORTS:
+            print(f"{Colors.CYAN}⏱  No se hizo ninguna importación diferida{Colors.ENDC}")
+            return
+        
+        print(f"{Colors.CYAN}⏱  Importaciones diferidas:{Colors.ENDC}")
+        for name, duration in LAZY_IMPORTS.items():
+            status = f"{duration:.1f} ms" if duration is not None else "no instalado"
+            print(f"{Colors.CYAN}   import {name}: {status}{Colors.ENDC}")
+        
+    def validate_file_path(self, path: str) -> Tuple[bool, str]:
+        if not path or path.strip() == '':
+            return False, "Ruta vacía"
+        
+        path = path.strip().strip('"').strip("'")
+        
+        if not os.path.exists(path):
+            return False, f"El archivo no existe: {path}"
+        
+        if not os.path.isfile(path):
+            return False, f"La ruta no es un archivo: {path}"
+        
+        ext = Path(path).suffix.lower()
+        if ext not in ['.pdf', '.txt', '.md']:
+            return False, f"Extensión no soportada: {ext}. Use .pdf, .txt o .md"
+        
+        if not os.access(path, os.R_OK):
+            return False, f"No hay permisos de lectura: {path}"
+        
+        return True, path
+    
+    def cache_lookup(self, path: str) -> Tuple[Optional[str], Optional[Tuple[List[str], bool]]]:
+        if self.cache is None:
+            return None, None
+        
+        try:
+            key = self.cache.file_key(path)
+        except OSError:
+            return None, None
+        
+        return key, self.cache.get(key)
+    
+    def cache_store(self, key: Optional[str], pages: List[str], complete: bool = True):
+        if not pages or key is None:
+            return
+        
+        try:
+            self.cache.put(key, pages, complete)
+        except OSError as e:
+            print(f"{Colors.YELLOW}⚠ No se pudo guardar en caché: {str(e)}{Colors.ENDC}")
+    
+    def join_pages(self, path: str, pages: List[str]) -> Optional[str]:
+        paged = Path(path).suffix.lower() == '.pdf'
+        
+        if self.compact:
+            content = ContentCompactor.compact(pages, paged)
+        elif paged:
+            content = "\n".join(page.strip() for page in pages if page and page.strip()).strip()
+        else:
+            content = ''.join(pages).strip()
+        
+        return content if content else None
+    
+    def read_file_content(self, path: str) -> Optional[str]:
+        return self.read_files_budgeted([path], sys.maxsize)[0]
+    
+    def open_file_pages(self, starts: Dict[str, int]) -> Tuple[Dict[str, Iterator[str]], Dict[str, str]]:
+        pdfs = {path: start for path, start in starts.items() if Path(path).suffix.lower() == '.pdf'}
+        sources: Dict[str, Iterator[str]] = {}
+        errors: Dict[str, str] = {}
+        
+        if pdfs and optional_import('PyPDF2') is None:
+            errors = {path: "PyPDF2 no instalado. Instala con: pip install PyPDF2" for path in pdfs}
+        elif pdfs:
+            sources, errors = self.extractor.open_pdfs(pdfs)
+        
+        for path, start in starts.items():
+            if path not in pdfs:
+                sources[path] = itertools.islice(TextFileReader.iter_chunks(path), start, None)
+        
+        return sources, errors
+    
+    def extract_file_pages(self, path: str, start: int = 0) -> Iterator[str]:
+        sources, errors = self.open_file_pages({path: start})
+        if path in errors:
+            raise RuntimeError(errors[path])
+        
+        return sources[path]
+    
+    def read_files_budgeted(self, paths: List[str], max_chars: int) -> List[Optional[str]]:
+        keys: Dict[str, Optional[str]] = {}
+        pages: Dict[str, List[str]] = {}
+        cached: Dict[str, int] = {}
+        complete: Dict[str, bool] = {}
+        
+        for path in dict.fromkeys(paths):
+            keys[path], entry = self.cache_lookup(path)
+            pages[path], complete[path] = entry if entry is not None else ([], False)
+            cached[path] = len(pages[path])
+        
+        sources, errors = self.open_file_pages({path: cached[path] for path in keys if not complete[path]})
+        for path, error in errors.items():
+            print(f"{Colors.RED}Error leyendo {Path(path).name}: {error}{Colors.ENDC}")
+        
+        def stream(path: str) -> Iterator[str]:
+            yield from pages[path][:cached[path]]
+            
+            if path in sources:
+                for page in sources[path]:
+                    pages[path].append(page)
+                    yield page
+                
+                complete[path] = True
+        
+        streams = {path: stream(path) for path in keys}
+        parts: Dict[str, List[str]] = {path: [] for path in keys}
+        active = list(streams)
+        used = 0
+        
+        try:
+            while active and used < max_chars:
+                for path in list(active):
+                    try:
+                        page = next(streams[path])
+                    except StopIteration:
+                        active.remove(path)
+                        continue
+                    except Exception as e:
+                        print(f"{Colors.RED}Error leyendo {Path(path).name}: {str(e)}{Colors.ENDC}")
+                        active.remove(path)
+                        continue
+                    
+                    if page:
+                        parts[path].append(page)
+                        used += len(page) + 1
+                    
+                    if used >= max_chars:
+                        break
+        finally:
+            for source in sources.values():
+                if hasattr(source, 'close'):
+                    source.close()
+            
+            for path in sources:
+                if len(pages[path]) > cached[path] or complete[path]:
+                    self.cache_store(keys[path], pages[path], complete[path])
+        
+        return [self.join_pages(path, parts[path]) for path in paths]
+    
+    def get_file_paths(self) -> List[str]:
+        print(f"\n{Colors.BOLD}📁 Ingreso de Archivos{Colors.ENDC}")
+        print(f"{Colors.CYAN}Puedes ingresar múltiples archivos separados por comas{Colors.ENDC}")
+        print(f"{Colors.YELLOW}Formatos soportados: PDF, TXT, MD{Colors.ENDC}\n")
+        
+        while True:
+            user_input = input(f"{Colors.GREEN}Rutas de archivos: {Colors.ENDC}").strip()
+            
+            if not user_input:
+                print(f"{Colors.RED}⚠ Debes ingresar al menos un archivo{Colors.ENDC}")
+                continue
+            
+            paths = [p.strip() for p in user_input.split(',')]
+            valid_paths = []
+            
+            for path in paths:
+                with self.tracer.span('validate_path'):
+                    is_valid, result = self.validate_file_path(path)
+                if is_valid:
+                    valid_paths.append(result)
+                    print(f"{Colors.GREEN}✓ Archivo válido: {Path(result).name}{Colors.ENDC}")
+                else:
+                    print(f"{Colors.RED}✗ {result}{Colors.ENDC}")
+            
+            if valid_paths:
+                return valid_paths
+            else:
+                print(f"{Colors.RED}⚠ No se encontraron archivos válidos. Intenta nuevamente.{Colors.ENDC}\n")
+    
+    def get_question_count(self) -> int:
+        print(f"\n{Colors.BOLD}❓ Configuración del Test{Colors.ENDC}")
+        
+        while True:
+            try:
+                count = input(f"{Colors.GREEN}Cantidad de preguntas a generar (1-{self.MAX_QUESTIONS}): {Colors.ENDC}").strip()
+                
+                if not count:
+                    print(f"{Colors.RED}⚠ Debes ingresar un número{Colors.ENDC}")
+                    continue
+                
+                count = int(count)
+                
+                if count < 1 or count > self.MAX_QUESTIONS:
+                    print(f"{Colors.RED}⚠ El número debe estar entre 1 y {self.MAX_QUESTIONS}{Colors.ENDC}")
+                    continue
+                
+                return count
+                
+            except ValueError:
+                print(f"{Colors.RED}⚠ Entrada inválida. Ingresa un número válido{Colors.ENDC}")
+    
+    def get_difficulty(self) -> str:
+        print(f"\n{Colors.BOLD}🎯 Nivel de Dificultad{Colors.ENDC}")
+        print(f"{Colors.CYAN}1.{Colors.ENDC} Fácil")
+        print(f"{Colors.CYAN}2.{Colors.ENDC} Medio")
+        print(f"{Colors.CYAN}3.{Colors.ENDC} Difícil")
+        print(f"{Colors.CYAN}4.{Colors.ENDC} Mixto")
+        
+        while True:
+            choice = input(f"\n{Colors.GREEN}Selecciona dificultad (1-4): {Colors.ENDC}").strip()
+            
+            if choice == '1':
+                return 'facil'
+            elif choice == '2':
+                return 'medio'
+            elif choice == '3':
+                return 'dificil'
+            elif choice == '4':
+                return 'mixto'
+            else:
+                print(f"{Colors.RED}⚠ Opción inválida{Colors.ENDC}")
+    
+    def get_topic(self) -> Optional[str]:
+        print(f"\n{Colors.BOLD}🔎 Tema (opcional){Colors.ENDC}")
+        topic = input(f"{Colors.GREEN}Enfocar las preguntas en un tema (Enter para todo el contenido): {Colors.ENDC}").strip()
+        return topic if topic else None
+    
+    def bank_key(self, documents: List[Tuple[str, str]], topic: Optional[str] = None) -> str:
+        text_hashes = sorted(QuestionBank.content_hash(text) for _, text in documents)
+        return QuestionBank.content_hash(*text_hashes, ' '.join(ChunkIndex.tokenize(topic or '')))
+    
+    def fetch_banked(self, bank_key: Optional[str], count: int, difficulty: str,
+                     served: Optional[set] = None, quiet: bool = False) -> List[Dict]:
+        if self.bank is None or not bank_key:
+            return []
+        
+        try:
+            banked = self.bank.fetch(bank_key, difficulty, count, served)
+        except sqlite3.Error as e:
+            print(f"{Colors.YELLOW}⚠ No se pudo leer el banco de preguntas: {str(e)}{Colors.ENDC}")
+            return []
+        
+        if banked and not quiet:
+            print(f"{Colors.GREEN}✓ {len(banked)} preguntas servidas desde el banco{Colors.ENDC}")
+        
+        return banked
+    
+    def store_banked(self, bank_key: Optional[str], difficulty: str, content: str, questions: List[Dict],
+                     served: Optional[set] = None):
+        if self.bank is None or not bank_key or not questions:
+            return
+        
+        try:
+            self.bank.store(bank_key, difficulty, QuestionBank.content_hash(content), questions, served)
+        except sqlite3.Error as e:
+            print(f"{Colors.YELLOW}⚠ No se pudo guardar en el banco de preguntas: {str(e)}{Colors.ENDC}")
+    
+    def build_index(self, documents: List[Tuple[str, str]]) -> ChunkIndex:
+        key = None
+        
+        if self.cache is not None:
+            digest = hashlib.sha256(f"index:{ChunkIndex.VERSION}:{ChunkIndex.CHUNK_CHARS}".encode('utf-8'))
+            for source, text in documents:
+                digest.update(f"\0{source}\0".encode('utf-8'))
+                digest.update(text.encode('utf-8'))
+            key = digest.hexdigest()
+            
+            entry = self.cache.get(key)
+            if entry is not None:
+                try:
+                    return ChunkIndex.from_dict(json.loads(entry[0][0]))
+                except (ValueError, KeyError):
+                    pass
+        
+        index = ChunkIndex.build(documents)
+        self.cache_store(key, [json.dumps(index.to_dict(), ensure_ascii=False)])
+        return index
+    
+    def select_content(self, documents: List[Tuple[str, str]], topic: Optional[str] = None, budget: Optional[int] = None) -> str:
+        budget = budget or self.PROMPT_TOKEN_BUDGET
+        
+        if (not topic and sum(len(text) for _, text in documents) <= budget * ContentCompactor.CHARS_PER_TOKEN * 2
+                and sum(ContentCompactor.estimate_tokens(text) for _, text in documents) <= budget):
+            return "\n\n".join(text for _, text in documents)
+        
+        index = self.build_index(documents)
+        selected = index.select(budget - 16 * len(documents), topic)
+        print(f"{Colors.GREEN}✓ {len(selected)} fragmentos seleccionados de {len(index.chunks)}{Colors.ENDC}")
+        return index.render(selected)
+    
+    def initialize_api_client(self) -> bool:
+        if self.client is not None:
+            return True
+        
+        anthropic = optional_import('anthropic')
+        if anthropic is None:
+            print(f"\n{Colors.RED}Error: Librería anthropic no instalada{Colors.ENDC}")
+            print(f"{Colors.YELLOW}Instala con: pip install anthropic{Colors.ENDC}")
+            return False
+        
+        if not self.api_key:
+            print(f"\n{Colors.YELLOW}⚠ No se encontró ANTHROPIC_API_KEY en variables de entorno{Colors.ENDC}")
+            self.api_key = input(f"{Colors.GREEN}Ingresa tu API Key de Anthropic: {Colors.ENDC}").strip()
+            
+            if not self.api_key:
+                print(f"{Colors.RED}API Key requerida para generar preguntas{Colors.ENDC}")
+                return False
+        
+        try:
+            self.client = anthropic.Anthropic(api_key=self.api_key, max_retries=0)
+            return True
+        except Exception as e:
+            print(f"{Colors.RED}Error inicializando cliente: {str(e)}{Colors.ENDC}")
+            return False
+    
+    def shard_count(self, count: int) -> int:
+        return -(-count // self.QUESTIONS_PER_SHARD)
+    
+    def split_content(self, content: str, parts: int) -> List[str]:
+        if parts <= 1:
+            return [content]
+        
+        passages = [p for p in content.split("\n\n") if p.strip()]
+        
+        if len(passages) < parts:
+            size = -(-len(content) // parts)
+            return [content[i * size:(i + 1) * size] for i in range(parts)]
+        
+        total = sum(len(p) for p in passages)
+        slices: List[List[str]] = [[] for _ in range(parts)]
+        offset = 0
+        
+        for passage in passages:
+            slices[min(parts - 1, int((offset + len(passage) / 2) * parts / total))].append(passage)
+            offset += len(passage)
+        
+        return ["\n\n".join(part) for part in slices if part]
+    
+    def build_messages(self, content: str, count: int, difficulty: str, exclude: Optional[List[str]] = None) -> List[Dict]:
+        prefix = f"""Analiza el siguiente contenido y genera preguntas de opción múltiple sobre él.
+
+CONTENIDO:
+{ContentCompactor.truncate(content, self.PROMPT_TOKEN_BUDGET)}
+
+INSTRUCCIONES CRÍTICAS:
+1. Las preguntas deben ser relevantes para el contenido
+2. Cada pregunta debe tener 4 opciones (A, B, C, D)
+3. Solo UNA opción es correcta
+4. Las opciones incorrectas deben ser plausibles pero claramente incorrectas
+5. Varía la posición de la respuesta correcta
+6. Incluye una explicación breve de por qué la respuesta es correcta
+
+FORMATO JSON ESTRICTO:
+{{
+  "preguntas": [
+    {{
+      "pregunta": "¿Texto de la pregunta?",
+      "opciones": {{
+        "A": "Primera opción",
+        "B": "Segunda opción",
+        "C": "Tercera opción",
+        "D": "Cuarta opción"
+      }},
+      "respuesta_correcta": "A",
+      "explicacion": "Explicación de por qué A es correcta"
+    }}
+  ]
+}}
+
+Responde ÚNICAMENTE con el JSON, sin texto adicional."""
+        
+        suffix = f"TAREA: genera exactamente {count} preguntas de nivel {self.DIFFICULTY_MAP[difficulty]}."
+        if exclude:
+            suffix += "\n\nNO repitas ninguna de estas preguntas ya generadas:\n" + "\n".join(f"- {text}" for text in exclude)
+        
+        return [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": suffix}
+            ]
+        }]
+    
+    @staticmethod
+    def estimate_tokens(messages: List[Dict]) -> int:
+        return sum(ContentCompactor.estimate_tokens(block['text']) for message in messages for block in message['content'])
+    
+    def validate_question(self, q: Dict) -> Optional[str]:
+        if not isinstance(q, dict) or not all(key in q for key in ['pregunta', 'opciones', 'respuesta_correcta']):
+            return "formato incorrecto"
+        
+        if not isinstance(q['opciones'], dict) or len(q['opciones']) != 4:
+            return "no tiene 4 opciones"
+        
+        if q['respuesta_correcta'] not in q['opciones']:
+            return "respuesta correcta inválida"
+        
+        return None
+    
+    def parse_response(self, response_text: str) -> Tuple[List[Dict], List[str], bool]:
+        start = response_text.find('{')
+        if start < 0:
+            raise ValueError("La respuesta no contiene JSON")
+        
+        truncated = False
+        
+        try:
+            data = json.loads(response_text[start:response_text.rfind('}') + 1])
+            items = data.get('preguntas') if isinstance(data, dict) else None
+        except json.JSONDecodeError:
+            items = QuestionStreamParser().feed(response_text[start:])
+            truncated = True
+        
+        if not isinstance(items, list):
+            raise ValueError("Formato de respuesta inválido")
+        
+        questions = []
+        errors = []
+        
+        for i, q in enumerate(items):
+            error = self.validate_question(q)
+            if error:
+                errors.append(f"Pregunta {i+1} con {error}")
+            else:
+                questions.append(q)
+        
+        return questions, errors, truncated
+    
+    def request_questions(self, content: str, count: int, difficulty: str, exclude: Optional[List[str]] = None,
+                          cancel: Optional[threading.Event] = None) -> List[Dict]:
+        with self.tracer.span('prompt', chars=len(content)):
+            messages = self.build_messages(content, count, difficulty, exclude)
+        
+        with self.tracer.span('api', questions=count):
+            message = self.scheduler.call(
+                self.client.messages.create,
+                self.estimate_tokens(messages),
+                cancel,
+                model=self.MODEL,
+                max_tokens=min(8000, 500 + count * self.TOKENS_PER_QUESTION),
+                messages=messages
+            )
+        
+        with self.tracer.span('parse') as span:
+            response_text = message.content[0].text
+            questions, errors, truncated = self.parse_response(response_text)
+            span['attributes'].update(response_chars=len(response_text), valid=len(questions),
+                                      invalid=len(errors), truncated=truncated)
+        
+        if not questions:
+            raise ValueError(errors[0] if errors else "La respuesta no contiene preguntas completas")
+        
+        return questions[:count]
+    
+    def request_shard(self, content: str, count: int, difficulty: str,
+                      deduplicator: Optional[QuestionDeduplicator] = None,
+                      cancel: Optional[threading.Event] = None) -> List[Dict]:
+        questions = self.request_questions(content, count, difficulty, None, cancel)
+        if deduplicator is not None:
+            questions = deduplicator.filter(questions)
+        return self.repair_questions(content, questions, count, difficulty, deduplicator, cancel)
+    
+    def repair_questions(self, content: str, questions: List[Dict], count: int, difficulty: str,
+                         deduplicator: Optional[QuestionDeduplicator] = None,
+                         cancel: Optional[threading.Event] = None) -> List[Dict]:
+        seen = {q['pregunta'] for q in questions}
+        
+        for _ in range(self.REPAIR_ATTEMPTS):
+            missing = count - len(questions)
+            if missing <= 0 or (cancel is not None and cancel.is_set()):
+                break
+            
+            with self.tracer.span('repair', questions=missing) as span:
+                try:
+                    extra = self.request_questions(content, missing, difficulty, sorted(seen), cancel)
+                except Exception as e:
+                    span['attributes']['error'] = str(e)
+                    continue
+                
+                for q in extra:
+                    if q['pregunta'] in seen or len(questions) >= count:
+                        continue
+                    seen.add(q['pregunta'])
+                    if deduplicator is None or deduplicator.accept(q):
+                        questions.append(q)
+        
+        return questions
+    
+    def plan_shards(self, content: str, count: int) -> Tuple[List[str], List[int]]:
+        contents = self.split_content(content, self.shard_count(count))
+        shards = len(contents)
+        return contents, [count // shards + (1 if i < count % shards else 0) for i in range(shards)]
+    
+    def stream_questions(self, content: str, count: int, difficulty: str) -> Iterator[Dict]:
+        parser = QuestionStreamParser()
+        messages = self.build_messages(content, count, difficulty)
+        estimated = self.estimate_tokens(messages)
+        
+        def open_stream():
+            manager = self.client.messages.stream(
+                model=self.MODEL,
+                max_tokens=min(8000, 500 + count * self.TOKENS_PER_QUESTION),
+                messages=messages
+            )
+            return manager, manager.__enter__()
+        
+        with self.scheduler.slot(estimated):
+            manager, stream = self.scheduler.retry(open_stream)
+            
+            try:
+                yield from self.parse_question_stream(stream, parser, count)
+                
+                if not self.stream_cancel.is_set():
+                    self.scheduler.record_usage(stream.get_final_message(), estimated)
+            finally:
+                manager.__exit__(None, None, None)
+    
+    def parse_question_stream(self, stream, parser: QuestionStreamParser, count: int) -> Iterator[Dict]:
+        produced = 0
+        
+        for text in stream.text_stream:
+            for q in parser.feed(text):
+                error = self.validate_question(q)
+                if error:
+                    self.stream_errors.append(f"Pregunta descartada: {error}")
+                    continue
+                
+                yield q
+                produced += 1
+                
+                if produced >= count:
+                    return
+            
+            if self.stream_cancel.is_set():
+                return
+    
+    def start_question_stream(self, workspace: SessionWorkspace, topic: Optional[str], count: int,
+                              difficulty: str) -> Optional[queue.Queue]:
+        self.stream_cancel.clear()
+        self.stream_errors = []
+        self.stream_produced = []
+        self.stream_finished = threading.Event()
+        output: queue.Queue = queue.Queue()
+        
+        bank_key = self.workspace_bank_key(workspace, topic)
+        banked = self.fetch_banked(bank_key, count, difficulty, workspace.served)
+        for q in banked:
+            self.stream_produced.append(q)
+            output.put(q)
+        
+        missing = count - len(banked)
+        if missing == 0:
+            self.stream_finished.set()
+            output.put(None)
+            return output
+        
+        if not self.initialize_api_client():
+            return None
+        
+        print(f"\n{Colors.CYAN}🤖 Generando {missing} preguntas con IA (modo streaming)...{Colors.ENDC}")
+        
+        contents, counts = self.plan_shards(self.prepare_content(workspace, topic, missing), missing)
+        deduplicator = QuestionDeduplicator(self.bank, bank_key)
+        parent = self.tracer.current()
+        produced_all = self.stream_produced
+        finished = self.stream_finished
+        
+        def produce_shard(i: int):
+            produced = []
+            start = time.perf_counter()
+            
+            with self.tracer.span('stream', parent, shard=i, questions=counts[i]) as span:
+                try:
+                    try:
+                        for q in self.stream_questions(contents[i], counts[i], difficulty):
+                            if self.stream_cancel.is_set():
+                                return
+                            if not deduplicator.accept(q):
+                                continue
+                            if not produced:
+                                span['attributes']['first_question_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                            produced.append(q)
+                            produced_all.append(q)
+                            output.put(q)
+                    except Exception as e:
+                        span['attributes']['error'] = str(e)
+                        self.stream_errors.append(f"Lote {i+1}/{len(contents)}: {str(e)}")
+                    
+                    if produced and len(produced) < counts[i] and not self.stream_cancel.is_set():
+                        for q in self.repair_questions(contents[i], list(produced), counts[i], difficulty,
+                                                       deduplicator)[len(produced):]:
+                            produced.append(q)
+                            produced_all.append(q)
+                            output.put(q)
+                finally:
+                    self.store_banked(bank_key, difficulty, contents[i], produced, workspace.served)
+        
+        def produce():
+            try:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(contents))) as pool:
+                    list(pool.map(produce_shard, range(len(contents))))
+            finally:
+                finished.set()
+                output.put(None)
+        
+        threading.Thread(target=produce, daemon=True).start()
+        return output
+    
+    def iter_question_stream(self, source: queue.Queue) -> Iterator[Dict]:
+        while True:
+            try:
+                question = source.get_nowait()
+            except queue.Empty:
+                print(f"{Colors.CYAN}⏳ Generando la siguiente pregunta...{Colors.ENDC}")
+                question = source.get()
+            
+            if question is None:
+                return
+            
+            self.questions.append(question)
+            yield question
+    
+    def generate_question_set(self, content: str, count: int, difficulty: str,
+                              progress: Optional[Callable[[int, int, Optional[List[Dict]], Optional[Exception]], None]] = None,
+                              deduplicator: Optional[QuestionDeduplicator] = None,
+                              cancel: Optional[threading.Event] = None
+                              ) -> Tuple[List[Dict], List[Tuple[str, List[Dict]]]]:
+        contents, counts = self.plan_shards(content, count)
+        shards = len(contents)
+        results: List[Optional[List[Dict]]] = [None] * shards
+        parent = self.tracer.current()
+        
+        def request_shard(i: int) -> List[Dict]:
+            if cancel is not None and cancel.is_set():
+                return []
+            
+            with self.tracer.span('shard', parent, shard=i, questions=counts[i]):
+                return self.request_shard(contents[i], counts[i], difficulty, deduplicator, cancel)
+        
+        for i, shard, error in iter_completed(request_shard, list(range(shards)), self.concurrency):
+            results[i] = shard
+            if progress is not None:
+                progress(i, shards, shard, error)
+        
+        generated = [q for shard in results if shard for q in shard]
+        return generated, [(contents[i], results[i]) for i in range(shards) if results[i]]
+    
+    def generate_questions(self, workspace: SessionWorkspace, topic: Optional[str], count: int, difficulty: str,
+                           prepared: Optional[List[Dict]] = None) -> bool:
+        bank_key = self.workspace_bank_key(workspace, topic)
+        banked = list(prepared or [])
+        
+        if len(banked) < count:
+            with self.tracer.span('bank.fetch') as span:
+                banked += self.fetch_banked(bank_key, count - len(banked), difficulty, workspace.served)
+                span['attributes']['questions'] = len(banked)
+        
+        if len(banked) >= count:
+            self.questions = banked[:count]
+            return True
+        
+        if not self.initialize_api_client():
+            return False
+        
+        requested = count
+        count -= len(banked)
+        
+        print(f"\n{Colors.CYAN}🤖 Generando {count} preguntas con IA...{Colors.ENDC}")
+        
+        def report(i: int, shards: int, questions: Optional[List[Dict]], error: Optional[Exception]):
+            if shards == 1:
+                if error is not None:
+                    print(f"{Colors.RED}Error generando preguntas: {str(error)}{Colors.ENDC}")
+            elif error is None:
+                print(f"{Colors.GREEN}✓ Lote {i+1}/{shards}: {len(questions)} preguntas{Colors.ENDC}")
+            else:
+                print(f"{Colors.RED}✗ Lote {i+1}/{shards}: {str(error)}{Colors.ENDC}")
+        
+        if self.shard_count(count) > 1:
+            print(f"{Colors.CYAN}Dividido en {self.shard_count(count)} lotes ({self.concurrency} en paralelo){Colors.ENDC}")
+        
+        deduplicator = QuestionDeduplicator(self.bank, bank_key)
+        
+        with self.tracer.span('generate', questions=count) as span:
+            generated, shards = self.generate_question_set(self.prepare_content(workspace, topic, count), count,
+                                                           difficulty, report, deduplicator)
+            span['attributes'].update(generated=len(generated), duplicates=deduplicator.dropped)
+        
+        if deduplicator.dropped:
+            print(f"{Colors.YELLOW}↷ {deduplicator.dropped} preguntas casi duplicadas descartadas{Colors.ENDC}")
+        
+        with self.tracer.span('bank.store'):
+            for shard_content, shard in shards:
+                self.store_banked(bank_key, difficulty, shard_content, shard, workspace.served)
+        
+        self.questions = banked + generated
+        
+        if not generated:
+            print(f"{Colors.RED}Error: No se generó ninguna pregunta válida{Colors.ENDC}")
+            if not banked:
+                return False
+        
+        if len(self.questions) != requested:
+            print(f"{Colors.YELLOW}⚠ Se generaron {len(self.questions)} preguntas (esperadas: {requested}){Colors.ENDC}")
+        
+        if generated:
+            print(f"{Colors.GREEN}✓ {len(generated)} preguntas generadas exitosamente{Colors.ENDC}")
+        return True
+    
+    def run_test(self, stream: Optional[queue.Queue] = None, expected: Optional[int] = None):
+        self.answers = []
+        start_time = time.time()
+        
+        if stream is not None:
+            self.questions = []
+            questions = self.iter_question_stream(stream)
+        else:
+            questions = self.questions
+        
+        total = expected or len(self.questions)
+        
+        print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
+        print(f"{Colors.BOLD}{Colors.CYAN}🎓 INICIANDO TEST{Colors.ENDC}")
+        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+        
+        for i, question in enumerate(questions, 1):
+            print(f"{Colors.BOLD}{Colors.BLUE}Pregunta {i}/{total}{Colors.ENDC}")
+            print(f"{Colors.YELLOW}{question['pregunta']}{Colors.ENDC}\n")
+            
+            for key in sorted(question['opciones'].keys()):
+                print(f"  {Colors.CYAN}{key}.{Colors.ENDC} {question['opciones'][key]}")
+            
+            while True:
+                answer = input(f"\n{Colors.GREEN}Tu respuesta (A/B/C/D) o 'salir': {Colors.ENDC}").strip().upper()
+                
+                if answer == 'SALIR':
+                    self.stream_cancel.set()
+                    print(f"\n{Colors.YELLOW}Test cancelado por el usuario{Colors.ENDC}")
+                    return False
+                
+                if answer in question['opciones']:
+                    self.answers.append(answer)
+                    break
+                else:
+                    print(f"{Colors.RED}⚠ Respuesta inválida. Usa A, B, C o D{Colors.ENDC}")
+            
+            print(f"\n{Colors.BOLD}{'─'*80}{Colors.ENDC}\n")
+        
+        if stream is not None:
+            for error in self.stream_errors:
+                print(f"{Colors.YELLOW}⚠ {error}{Colors.ENDC}")
+            
+            if not self.questions:
+                print(f"{Colors.RED}Error: No se generó ninguna pregunta válida{Colors.ENDC}")
+                return False
+            
+            if len(self.questions) != expected:
+                print(f"{Colors.YELLOW}⚠ Se generaron {len(self.questions)} preguntas (esperadas: {expected}){Colors.ENDC}")
+                input(f"\n{Colors.CYAN}Presiona Enter para ver los resultados...{Colors.ENDC}")
+        
+        elapsed_time = time.time() - start_time
+        self.show_results(elapsed_time)
+        return True
+    
+    def show_results(self, elapsed_time: float):
+        self.clear_screen()
+        print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
+        print(f"{Colors.BOLD}{Colors.CYAN}📊 RESULTADOS DEL TEST{Colors.ENDC}")
+        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+        
+        correct = 0
+        total = len(self.questions)
+        
+        for i, (question, user_answer) in enumerate(zip(self.questions, self.answers), 1):
+            correct_answer = question['respuesta_correcta']
+            is_correct = user_answer == correct_answer
+            
+            if is_correct:
+                correct += 1
+                status = f"{Colors.GREEN}✓ CORRECTO{Colors.ENDC}"
+            else:
+                status = f"{Colors.RED}✗ INCORRECTO{Colors.ENDC}"
+            
+            print(f"{Colors.BOLD}Pregunta {i}:{Colors.ENDC} {question['pregunta']}")
+            print(f"Tu respuesta: {Colors.CYAN}{user_answer}{Colors.ENDC} | Correcta: {Colors.GREEN}{correct_answer}{Colors.ENDC} | {status}")
+            
+            if not is_correct and 'explicacion' in question:
+                print(f"{Colors.YELLOW}💡 {question['explicacion']}{Colors.ENDC}")
+            
+            print(f"{Colors.BOLD}{'─'*80}{Colors.ENDC}\n")
+        
+        percentage = (correct / total) * 100
+        
+        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}")
+        print(f"{Colors.BOLD}Preguntas correctas: {Colors.GREEN}{correct}/{total}{Colors.ENDC}")
+        print(f"{Colors.BOLD}Porcentaje: {self.get_grade_color(percentage)}{percentage:.1f}%{Colors.ENDC}")
+        print(f"{Colors.BOLD}Tiempo total: {Colors.CYAN}{self.format_time(elapsed_time)}{Colors.ENDC}")
+        print(f"{Colors.BOLD}Calificación: {self.get_grade_text(percentage)}{Colors.ENDC}")
+        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+        
+        self.save_result(correct, total, percentage, elapsed_time)
+    
+    def get_grade_color(self, percentage: float) -> str:
+        if percentage >= 90:
+            return Colors.GREEN
+        elif percentage >= 70:
+            return Colors.YELLOW
+        else:
+            return Colors.RED
+    
+    @classmethod
+    def grade_label(cls, percentage: float) -> str:
+        for threshold, label, _ in cls.GRADE_BANDS:
+            if percentage >= threshold:
+                return label
+        return cls.GRADE_BANDS[-1][1]
+    
+    def get_grade_text(self, percentage: float) -> str:
+        for threshold, label, color in self.GRADE_BANDS:
+            if percentage >= threshold:
+                return f"{color}{label}{Colors.ENDC}"
+        return f"{self.GRADE_BANDS[-1][2]}{self.GRADE_BANDS[-1][1]}{Colors.ENDC}"
+    
+    def format_time(self, seconds: float) -> str:
+        minutes = int(seconds // 60)
+        secs = int(seconds % 60)
+        return f"{minutes}m {secs}s"
+    
+    def save_result(self, correct: int, total: int, percentage: float, time: float):
+        result = {
+            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'correctas': correct,
+            'total': total,
+            'porcentaje': round(percentage, 2),
+            'tiempo': round(time, 2),
+            **self.result_context
+        }
+        
+        self.results_history.append(result)
+        
+        try:
+            if self.history is None:
+                self.history = HistoryStore()
+            
+            self.history.append(result)
+                
+        except Exception as e:
+            print(f"{Colors.YELLOW}⚠ No se pudo guardar el historial: {str(e)}{Colors.ENDC}")
+    
+    def show_history(self):
+        try:
+            if self.history is None:
+                self.history = HistoryStore()
+            
+            if not self.history.path.exists():
+                print(f"\n{Colors.YELLOW}No hay historial previo{Colors.ENDC}")
+                return
+            
+            history = self.history.tail(10)
+            
+            if not history:
+                print(f"\n{Colors.YELLOW}El historial está vacío{Colors.ENDC}")
+                return
+            
+            self.clear_screen()
+            print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
+            print(f"{Colors.BOLD}{Colors.CYAN}📈 HISTORIAL DE RESULTADOS{Colors.ENDC}")
+            print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+            
+            for i, result in enumerate(history, 1):
+                percentage = result['porcentaje']
+                color = self.get_grade_color(percentage)
+                
+                print(f"{Colors.BOLD}Test #{i}{Colors.ENDC}")
+                print(f"Fecha: {Colors.CYAN}{result['fecha']}{Colors.ENDC}")
+                print(f"Resultado: {Colors.GREEN}{result['correctas']}/{result['total']}{Colors.ENDC} ({color}{percentage}%{Colors.ENDC})")
+                print(f"Tiempo: {Colors.CYAN}{self.format_time(result['tiempo'])}{Colors.ENDC}")
+                print(f"{Colors.BOLD}{'─'*80}{Colors.ENDC}\n")
+            
+            total = self.history.count()
+            if total > 10:
+                print(f"{Colors.YELLOW}Mostrando últimos 10 resultados de {total} totales{Colors.ENDC}\n")
+                
+        except Exception as e:
+            print(f"{Colors.RED}Error cargando historial: {str(e)}{Colors.ENDC}")
+    
+    def show_stats(self):
+        try:
+            if self.history is None:
+                self.history = HistoryStore()
+            
+            stats = self.history.stats()
+        except Exception as e:
+            print(f"{Colors.RED}Error cargando estadísticas: {str(e)}{Colors.ENDC}")
+            return
+        
+        total = stats['total']
+        if not total:
+            print(f"\n{Colors.YELLOW}No hay historial previo{Colors.ENDC}")
+            return
+        
+        def average(bucket: Dict) -> float:
+            return bucket['porcentaje'] / bucket['tests']
+        
+        def per_question(bucket: Dict) -> str:
+            return f"{bucket['tiempo'] / bucket['preguntas']:.1f}s" if bucket['preguntas'] else '-'
+        
+        def print_bucket(name: str, bucket: Dict):
+            color = self.get_grade_color(average(bucket))
+            print(f"  {name:<40} {bucket['tests']:>6} {color}{average(bucket):>9.1f}%{Colors.ENDC} {per_question(bucket):>12}")
+        
+        self.clear_screen()
+        print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
+        print(f"{Colors.BOLD}{Colors.CYAN}📊 ESTADÍSTICAS{Colors.ENDC}")
+        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+        
+        overall = average(total)
+        recent = sum(stats['recientes']) / len(stats['recientes'])
+        trend = '↑' if recent > overall + 1 else '↓' if recent < overall - 1 else '→'
+        
+        print(f"Tests realizados: {Colors.CYAN}{total['tests']}{Colors.ENDC} ({total['preguntas']} preguntas)")
+        print(f"Promedio general: {self.get_grade_color(overall)}{overall:.1f}%{Colors.ENDC} | "
+              f"Mejor resultado: {Colors.GREEN}{total['mejor']}%{Colors.ENDC}")
+        print(f"Promedio de los últimos {len(stats['recientes'])}: {self.get_grade_color(recent)}{recent:.1f}%{Colors.ENDC} {trend}")
+        print(f"Tiempo por pregunta: {Colors.CYAN}{per_question(total)}{Colors.ENDC}")
+        
+        header = f"{Colors.BOLD}  {'':<40} {'Tests':>6} {'Promedio':>10} {'s/pregunta':>12}{Colors.ENDC}"
+        
+        print(f"\n{Colors.BOLD}Por mes{Colors.ENDC}")
+        print(header)
+        for month in sorted(stats['por_mes'])[-12:]:
+            print_bucket(month, stats['por_mes'][month])
+        
+        if stats['por_dificultad']:
+            print(f"\n{Colors.BOLD}Por dificultad{Colors.ENDC}")
+            print(header)
+            for difficulty, label in self.DIFFICULTY_LABELS.items():
+                if difficulty in stats['por_dificultad']:
+                    print_bucket(label, stats['por_dificultad'][difficulty])
+        
+        if stats['por_documento']:
+            print(f"\n{Colors.BOLD}Por documento{Colors.ENDC}")
+            print(header)
+            documents = stats['por_documento']
+            for name in sorted(documents, key=lambda name: documents[name]['tests'], reverse=True)[:10]:
+                print_bucket(name if len(name) <= 40 else name[:37] + '...', documents[name])
+    
+    def main_menu(self):
+        while True:
+            print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
+            print(f"{Colors.BOLD}{Colors.CYAN}MENÚ PRINCIPAL{Colors.ENDC}")
+            print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+            print(f"{Colors.CYAN}1.{Colors.ENDC} Nuevo Test")
+            print(f"{Colors.CYAN}2.{Colors.ENDC} Ver Historial")
+            print(f"{Colors.CYAN}3.{Colors.ENDC} Estadísticas")
+            print(f"{Colors.CYAN}4.{Colors.ENDC} Salir")
+            
+            choice = input(f"\n{Colors.GREEN}Selecciona una opción (1-4): {Colors.ENDC}").strip()
+            
+            if choice == '1':
+                return True
+            elif choice == '2':
+                self.show_history()
+                input(f"\n{Colors.CYAN}Presiona Enter para continuar...{Colors.ENDC}")
+                self.clear_screen()
+                self.print_banner()
+            elif choice == '3':
+                self.show_stats()
+                input(f"\n{Colors.CYAN}Presiona Enter para continuar...{Colors.ENDC}")
+                self.clear_screen()
+                self.print_banner()
+            elif choice == '4':
+                print(f"\n{Colors.GREEN}¡Hasta luego! 👋{Colors.ENDC}\n")
+                return False
+            else:
+                print(f"{Colors.RED}⚠ Opción inválida{Colors.ENDC}")
+    
+    def load_documents(self) -> Optional[SessionWorkspace]:
+        file_paths = self.get_file_paths()
+        
+        print(f"\n{Colors.CYAN}📖 Leyendo archivos...{Colors.ENDC}")
+        
+        with self.tracer.span('extract', files=len(file_paths)) as span:
+            contents = self.read_files_budgeted(file_paths, self.INDEX_CHAR_BUDGET)
+            span['attributes']['chars'] = sum(len(content) for content in contents if content)
+        
+        documents = []
+        for path, content in zip(file_paths, contents):
+            if content:
+                documents.append((Path(path).name, content))
+                print(f"{Colors.GREEN}✓ Contenido extraído de: {Path(path).name}{Colors.ENDC}")
+            else:
+                print(f"{Colors.RED}✗ No se pudo leer: {Path(path).name}{Colors.ENDC}")
+        
+        if not documents:
+            print(f"\n{Colors.RED}Error: No se pudo extraer contenido de ningún archivo{Colors.ENDC}")
+            return None
+        
+        if sum(len(text) for _, text in documents) < 100:
+            print(f"\n{Colors.RED}Error: Contenido insuficiente para generar preguntas{Colors.ENDC}")
+            return None
+        
+        return SessionWorkspace(documents)
+    
+    def workspace_bank_key(self, workspace: SessionWorkspace, topic: Optional[str]) -> str:
+        key = ' '.join(ChunkIndex.tokenize(topic or ''))
+        
+        if key not in workspace.bank_keys:
+            workspace.bank_keys[key] = self.bank_key(workspace.documents, topic)
+        
+        return workspace.bank_keys[key]
+    
+    def prepare_content(self, workspace: SessionWorkspace, topic: Optional[str], count: int) -> str:
+        key = (' '.join(ChunkIndex.tokenize(topic or '')), self.shard_count(count))
+        
+        if key not in workspace.selections:
+            with self.tracer.span('select', topic=topic or ''):
+                workspace.selections[key] = self.select_content(workspace.documents, topic,
+                                                                self.PROMPT_TOKEN_BUDGET * key[1])
+        
+        return workspace.selections[key]
+    
+    def report_prompt_cache(self, before: Dict):
+        after = self.scheduler.metrics()
+        read = after['cache_read_tokens'] - before['cache_read_tokens']
+        written = after['cache_write_tokens'] - before['cache_write_tokens']
+        
+        if read or written:
+            print(f"{Colors.CYAN}💾 Caché de prompt: {read} tokens leídos, {written} tokens escritos{Colors.ENDC}")
+    
+    def prefetch_questions(self, workspace: SessionWorkspace, topic: Optional[str], count: int, difficulty: str,
+                           current: List[Dict], finished: Optional[threading.Event], cancel: threading.Event) -> List[Dict]:
+        if finished is not None:
+            while not finished.wait(0.1):
+                if cancel.is_set():
+                    return []
+        
+        bank_key = self.workspace_bank_key(workspace, topic)
+        banked = self.fetch_banked(bank_key, count, difficulty, workspace.served, quiet=True)
+        missing = count - len(banked)
+        if missing <= 0 or cancel.is_set():
+            return banked
+        
+        deduplicator = QuestionDeduplicator(self.bank, bank_key)
+        deduplicator.filter(current)
+        content = self.prepare_content(workspace, topic, missing)
+        
+        with self.tracer.span('prefetch', questions=missing):
+            generated, shards = self.generate_question_set(content, missing, difficulty, None, deduplicator, cancel)
+        
+        for shard_content, shard in shards:
+            self.store_banked(bank_key, difficulty, shard_content, shard, workspace.served)
+        return banked + generated
+    
+    def start_prefetch(self, key: Tuple, workspace: SessionWorkspace, topic: Optional[str], count: int, difficulty: str,
+                       streaming: bool = False):
+        if self.prefetcher is None or self.client is None:
+            return
+        
+        if streaming:
+            current, finished = self.stream_produced, self.stream_finished
+        else:
+            current, finished = list(self.questions), None
+        
+        self.prefetcher.start(key, lambda cancel: self.prefetch_questions(workspace, topic, count, difficulty,
+                                                                            current, finished, cancel))
+    
+    def use_prefetched(self, key: Tuple) -> Optional[List[Dict]]:
+        if self.prefetcher is None:
+            return None
+        
+        self.prefetcher.cancel(keep=key)
+        ready = self.prefetcher.ready(key)
+        if ready is None:
+            return None
+        
+        if not ready:
+            print(f"\n{Colors.CYAN}⏳ Terminando las preguntas preparadas en segundo plano...{Colors.ENDC}")
+        
+        prepared = self.prefetcher.take(key)
+        if not prepared:
+            return None
+        
+        print(f"\n{Colors.GREEN}✓ {len(prepared)} preguntas preparadas en segundo plano{Colors.ENDC}")
+        return prepared
+    
+    def run_round(self, workspace: SessionWorkspace) -> bool:
+        question_count = self.get_question_count()
+        difficulty = self.get_difficulty()
+        topic = self.get_topic()
+        
+        prefetch_key = (self.workspace_bank_key(workspace, topic), question_count, difficulty)
+        usage = self.scheduler.metrics()
+        stream = None
+        
+        with self.tracer.span('questions', questions=question_count, difficulty=difficulty, stream=self.stream_mode):
+            prepared = self.use_prefetched(prefetch_key)
+            
+            if self.stream_mode and prepared is None:
+                stream = self.start_question_stream(workspace, topic, question_count, difficulty)
+                generated = stream is not None
+            else:
+                generated = self.generate_questions(workspace, topic, question_count, difficulty, prepared)
+        
+        if not generated:
+            print(f"\n{Colors.RED}No se pudieron generar las preguntas{Colors.ENDC}")
+            return False
+        
+        input(f"\n{Colors.CYAN}Presiona Enter para comenzar el test...{Colors.ENDC}")
+        self.clear_screen()
+        
+        self.start_prefetch(prefetch_key, workspace, topic, question_count, difficulty, stream is not None)
+        self.result_context = {'dificultad': difficulty, 'documentos': [name for name, _ in workspace.documents]}
+        completed = self.run_test(stream, question_count if stream is not None else None)
+        workspace.rounds += 1
+        self.report_prompt_cache(usage)
+        return completed
+    
+    def ask_yes_no(self, question: str) -> bool:
+        while True:
+            choice = input(f"\n{Colors.GREEN}{question} (s/n): {Colors.ENDC}").strip().lower()
+            
+            if choice in ('s', 'n'):
+                return choice == 's'
+            
+            print(f"{Colors.RED}⚠ Respuesta inválida{Colors.ENDC}")
+    
+    def run(self):
+        self.print_banner()
+        
+        if self.startup_report:
+            self.print_startup_report()
+            self.startup_report = False
+        
+        if not self.main_menu():
+            return
+        
+        workspace = self.load_documents()
+        
+        while workspace is not None and self.run_round(workspace):
+            if not self.ask_yes_no("¿Realizar otro test?"):
+                print(f"\n{Colors.GREEN}¡Hasta luego! 👋{Colors.ENDC}\n")
+                return
+            
+            if not self.ask_yes_no(f"¿Usar los mismos documentos ({len(workspace.documents)})?"):
+                if self.prefetcher is not None:
+                    self.prefetcher.cancel()
+                workspace = self.load_documents()
+
+
+class BatchRunner:
+    
+    SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+    
+    def __init__(self, app: QuadraTurboTest, output_dir: str, count: int = 10, difficulty: str = 'medio',
+                 topic: Optional[str] = None, workers: int = 2):
+        self.app = app
+        self.output_dir = Path(output_dir)
+        self.count = count
+        self.difficulty = difficulty
+        self.topic = topic
+        self.workers = max(1, workers)
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {'documentos': 0, 'omitidos': 0, 'fallidos': 0, 'escritos': 0, 'incompletos': 0, 'preguntas': 0,
+                      'duplicados': 0}
+        
+    def log(self, message: str):
+        with self.lock:
+            print(message, flush=True)
+    
+    def discover(self, source: str) -> List[Dict]:
+        source_path = Path(source)
+        entries: List = []
+        base = source_path.parent
+        
+        if source_path.is_dir():
+            entries = sorted(str(path) for path in source_path.rglob('*')
+                             if path.is_file() and path.suffix.lower() in self.SUPPORTED_EXTENSIONS)
+            base = Path('.')
+        else:
+            with open(source_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if not isinstance(entries, list):
+                raise ValueError("El manifiesto debe ser una lista JSON de rutas u objetos con 'path'")
+        
+        jobs = []
+        for entry in entries:
+            job = dict(entry) if isinstance(entry, dict) else {'path': entry}
+            path = Path(job['path'])
+            job['path'] = str(path if path.is_absolute() else base / path)
+            job.setdefault('count', self.count)
+            job.setdefault('difficulty', self.difficulty)
+            job.setdefault('topic', self.topic)
+            
+            if job['difficulty'] not in QuadraTurboTest.DIFFICULTY_MAP:
+                raise ValueError(f"Dificultad inválida en {job['path']}: {job['difficulty']}")
+            
+            jobs.append(job)
+        
+        return jobs
+    
+    def output_path(self, job: Dict) -> Path:
+        digest = hashlib.sha256(f"{job['count']}:{job['difficulty']}:{job['topic'] or ''}:".encode('utf-8'))
+        with open(job['path'], 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        
+        return self.output_dir / f"{Path(job['path']).stem}-{job['difficulty']}-{job['count']}-{digest.hexdigest()[:12]}.json"
+    
+    def extract(self, job: Dict) -> Dict:
+        with self.app.tracer.span('extract', file=job['path']):
+            content = self.app.read_files_budgeted([job['path']], self.app.INDEX_CHAR_BUDGET)[0]
+        
+        if not content or len(content) < 100:
+            raise ValueError("Contenido insuficiente para generar preguntas")
+        
+        documents = [(Path(job['path']).name, content)]
+        job['bank_key'] = self.app.bank_key(documents, job['topic'])
+        job['questions'] = []
+        
+        if self.app.bank is not None:
+            job['questions'] = self.app.bank.fetch(job['bank_key'], job['difficulty'], job['count'])
+        
+        missing = job['count'] - len(job['questions'])
+        if missing > 0:
+            with self.app.tracer.span('select', file=job['path']):
+                budget = self.app.PROMPT_TOKEN_BUDGET * self.app.shard_count(missing)
+                job['content'] = self.app.select_content(documents, job['topic'], budget)
+        return job
+    
+    def generate(self, job: Dict) -> Dict:
+        banked = job['questions']
+        generated: List[Dict] = []
+        missing = job['count'] - len(banked)
+        
+        if missing > 0:
+            deduplicator = QuestionDeduplicator(self.app.bank, job['bank_key'])
+            with self.app.tracer.span('generate', file=job['path'], questions=missing):
+                generated, shards = self.app.generate_question_set(job.pop('content'), missing, job['difficulty'],
+                                                                   deduplicator=deduplicator)
+            with self.lock:
+                self.stats['duplicados'] += deduplicator.dropped
+            for shard_content, shard in shards:
+                self.app.store_banked(job['bank_key'], job['difficulty'], shard_content, shard)
+        
+        job['questions'] = banked + generated
+        job['banked'] = len(banked)
+        return job
+    
+    def validate(self, job: Dict) -> Dict:
+        questions = [q for q in job['questions'] if self.app.validate_question(q) is None]
+        
+        if not questions:
+            raise ValueError("No se generó ninguna pregunta válida")
+        
+        job['questions'] = questions
+        return job
+    
+    def write(self, job: Dict) -> Dict:
+        quiz = {
+            'archivo': job['path'],
+            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'dificultad': job['difficulty'],
+            'tema': job['topic'],
+            'solicitadas': job['count'],
+            'preguntas': job['questions']
+        }
+        
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = job['output'].with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(quiz, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, job['output'])
+        
+        short = len(job['questions']) < job['count']
+        with self.lock:
+            self.stats['escritos'] += 1
+            self.stats['incompletos'] += short
+            self.stats['preguntas'] += len(job['questions'])
+        
+        status = f"{len(job['questions'])}/{job['count']} preguntas"
+        if job['banked']:
+            status += f", {job['banked']} del banco"
+        
+        if short:
+            self.log(f"{Colors.YELLOW}⚠ {Path(job['path']).name}: {status}, incompleto → {job['output'].name}{Colors.ENDC}")
+        else:
+            self.log(f"{Colors.GREEN}✓ {Path(job['path']).name}: {status} → {job['output'].name}{Colors.ENDC}")
+        return job
+    
+    @staticmethod
+    def is_short(path: Path) -> bool:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                quiz = json.load(f)
+            return len(quiz['preguntas']) < quiz['solicitadas']
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+    
+    def run_stage(self, name: str, func: Callable[[Dict], Dict], inbox: queue.Queue,
+                  outbox: Optional[queue.Queue], workers: int, downstream: int) -> threading.Thread:
+        def work():
             while True:
-                choice = input(f"\n{Colors.GREEN}¿Realizar otro test? (s/n): {Colors.ENDC}").strip().lower()
+                job = inbox.get()
+                if job is None:
+                    return
                 
-                if choice == 's':
-                    self.run()
-                    break
-                elif choice == 'n':
-                    print(f"\n{Colors.GREEN}¡Hasta luego! 👋{Colors.ENDC}\n")
+                if self.stop.is_set():
+                    continue
+                
+                try:
+                    result = func(job)
+                except Exception as e:
+                    with self.lock:
+                        self.stats['fallidos'] += 1
+                    self.log(f"{Colors.RED}✗ {Path(job['path']).name} ({name}): {str(e)}{Colors.ENDC}")
+                    continue
+                
+                if outbox is not None:
+                    outbox.put(result)
+        
+        def supervise():
+            threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if outbox is not None:
+                for _ in range(downstream):
+                    outbox.put(None)
+        
+        supervisor = threading.Thread(target=supervise, daemon=True)
+        supervisor.start()
+        return supervisor
+    
+    def run(self, source: str) -> Dict:
+        jobs = self.discover(source)
+        start_time = time.time()
+        
+        depth = self.workers * 2
+        extract_queue: queue.Queue = queue.Queue(maxsize=depth)
+        generate_queue: queue.Queue = queue.Queue(maxsize=depth)
+        validate_queue: queue.Queue = queue.Queue(maxsize=depth)
+        write_queue: queue.Queue = queue.Queue(maxsize=depth)
+        
+        stages = [
+            self.run_stage('extracción', self.extract, extract_queue, generate_queue, self.workers, self.workers),
+            self.run_stage('generación', self.generate, generate_queue, validate_queue, self.workers, 1),
+            self.run_stage('validación', self.validate, validate_queue, write_queue, 1, 1),
+            self.run_stage('escritura', self.write, write_queue, None, 1, 0)
+        ]
+        
+        self.log(f"{Colors.CYAN}📦 Procesando {len(jobs)} documentos → {self.output_dir}{Colors.ENDC}")
+        
+        try:
+            for job in jobs:
+                self.stats['documentos'] += 1
+                
+                try:
+                    job['output'] = self.output_path(job)
+                except OSError as e:
+                    with self.lock:
+                        self.stats['fallidos'] += 1
+                    self.log(f"{Colors.RED}✗ {Path(job['path']).name}: {str(e)}{Colors.ENDC}")
+                    continue
+                
+                if job['output'].exists():
+                    self.stats['omitidos'] += 1
+                    if self.is_short(job['output']):
+                        self.stats['incompletos'] += 1
+                        self.log(f"{Colors.YELLOW}↷ {Path(job['path']).name}: ya generado (incompleto), se omite{Colors.ENDC}")
+                    else:
+                        self.log(f"{Colors.YELLOW}↷ {Path(job['path']).name}: ya generado, se omite{Colors.ENDC}")
+                    continue
+                
+                extract_queue.put(job)
+        except KeyboardInterrupt:
+            self.stop.set()
+            self.log(f"{Colors.YELLOW}Interrumpido: se terminan los documentos en curso...{Colors.ENDC}")
+        finally:
+            for _ in range(self.workers):
+                extract_queue.put(None)
+        
+        try:
+            for stage in stages:
+                while stage.is_alive():
+                    stage.join(0.2)
+        except KeyboardInterrupt:
+            self.stop.set()
+            self.log(f"{Colors.YELLOW}Interrumpido: vuelve a ejecutar el mismo comando para reanudar{Colors.ENDC}")
+        
+        elapsed = time.time() - start_time
+        report = dict(self.stats)
+        report['segundos'] = round(elapsed, 3)
+        report['documentos_por_minuto'] = round(report['escritos'] * 60 / elapsed, 2) if elapsed else 0.0
+        report['preguntas_por_segundo'] = round(report['preguntas'] / elapsed, 2) if elapsed else 0.0
+        report['api'] = self.app.scheduler.metrics()
+        
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.output_dir / 'batch_report.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        
+        self.log(f"\n{Colors.BOLD}Escritos: {report['escritos']} | Omitidos: {report['omitidos']} | "
+                 f"Fallidos: {report['fallidos']} | Incompletos: {report['incompletos']} | Preguntas: {report['preguntas']} | "
+                 f"Duplicados: {report['duplicados']}{Colors.ENDC}")
+        self.log(f"{Colors.CYAN}Tiempo: {elapsed:.1f}s | {report['documentos_por_minuto']} documentos/min | "
+                 f"{report['preguntas_por_segundo']} preguntas/s{Colors.ENDC}")
+        return report
+
+
+class BulkGrader:
+    
+    OPTIONS = 'ABCD'
+    UPPER_LOWER = 0.27
+    MIN_DISCRIMINATION = 0.2
+    
+    def __init__(self, quiz: Dict):
+        self.np = optional_import('numpy')
+        if self.np is None:
+            raise RuntimeError("NumPy no instalado. Instala con: pip install numpy")
+        
+        self.quiz = quiz
+        self.questions = quiz['preguntas'] if isinstance(quiz, dict) else quiz
+        if not self.questions:
+            raise ValueError("El test no contiene preguntas")
+        
+        self.key = self.np.array([self.OPTIONS.find(q['respuesta_correcta']) for q in self.questions], dtype=self.np.int8)
+        if (self.key < 0).any():
+            raise ValueError("El test tiene respuestas correctas fuera de A-D")
+    
+    @classmethod
+    def load(cls, path: str) -> 'BulkGrader':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def read_sheets(self, path: str) -> Tuple[List[str], List[List[str]]]:
+        if Path(path).suffix.lower() == '.parquet':
+            parquet = optional_import('pyarrow.parquet')
+            if parquet is None:
+                raise RuntimeError("pyarrow no instalado. Instala con: pip install pyarrow")
+            
+            columns = list(parquet.read_table(path).to_pydict().values())
+            students = [str(value) for value in columns[0]]
+            answers = [[value or '' for value in row] for row in zip(*columns[1:])]
+            return students, answers
+        
+        import csv
+        
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            
+            rows = [row for row in csv.reader(f, dialect) if row]
+        
+        if rows and not self.is_answer_row(rows[0]):
+            rows = rows[1:]
+        
+        return [row[0] for row in rows], [row[1:] for row in rows]
+    
+    @classmethod
+    def is_answer_row(cls, row: List[str]) -> bool:
+        return all(len(cell.strip()) <= 1 and cell.strip().upper() in cls.OPTIONS for cell in row[1:])
+    
+    def encode(self, answers: List[List[str]]):
+        np = self.np
+        count = len(self.questions)
+        
+        for i, row in enumerate(answers):
+            if len(row) != count:
+                raise ValueError(f"La hoja {i + 1} tiene {len(row)} respuestas y el test {count} preguntas")
+        
+        letters = np.char.upper(np.char.strip(np.array(answers, dtype=str).reshape(len(answers), count)))
+        codes = np.full(letters.shape, len(self.OPTIONS), dtype=np.int8)
+        for i, option in enumerate(self.OPTIONS):
+            codes[letters == option] = i
+        return codes
+    
+    def grade(self, students: List[str], answers: List[List[str]]) -> Dict:
+        np = self.np
+        codes = self.encode(answers)
+        sheets, count = codes.shape
+        
+        correct = codes == self.key
+        scores = correct.sum(axis=1)
+        percentages = scores * 100.0 / count
+        
+        thresholds = np.array([band[0] for band in reversed(QuadraTurboTest.GRADE_BANDS)])
+        bands = len(thresholds) - np.searchsorted(thresholds, percentages, side='right')
+        
+        order = np.argsort(scores, kind='stable')
+        group = max(1, int(round(sheets * self.UPPER_LOWER)))
+        difficulty = correct.mean(axis=0)
+        discrimination = correct[order[-group:]].mean(axis=0) - correct[order[:group]].mean(axis=0)
+        
+        rest = scores[:, None] - correct
+        centered_rest = rest - rest.mean(axis=0)
+        centered_item = correct - difficulty
+        spread = np.sqrt((centered_rest ** 2).sum(axis=0) * (centered_item ** 2).sum(axis=0))
+        correlation = np.divide((centered_rest * centered_item).sum(axis=0), spread,
+                                out=np.zeros(count), where=spread > 0)
+        
+        offsets = codes.astype(np.int64) + np.arange(count) * (len(self.OPTIONS) + 1)
+        frequencies = np.bincount(offsets.ravel(), minlength=count * (len(self.OPTIONS) + 1))
+        frequencies = frequencies.reshape(count, len(self.OPTIONS) + 1) / sheets
+        
+        return {
+            'hojas': int(sheets),
+            'preguntas_test': int(count),
+            'media': round(float(percentages.mean()), 2),
+            'mediana': round(float(np.median(percentages)), 2),
+            'desviacion': round(float(percentages.std()), 2),
+            'calificaciones': {QuadraTurboTest.GRADE_BANDS[band][1]: int(total)
+                               for band, total in enumerate(np.bincount(bands, minlength=len(thresholds)))},
+            'alumnos': [{
+                'alumno': student,
+                'correctas': int(score),
+                'total': int(count),
+                'porcentaje': round(float(percentage), 2),
+                'calificacion': QuadraTurboTest.GRADE_BANDS[band][1]
+            } for student, score, percentage, band in zip(students, scores.tolist(), percentages.tolist(), bands.tolist())],
+            'items': [{
+                'pregunta': i + 1,
+                'respuesta_correcta': self.OPTIONS[self.key[i]],
+                'dificultad': round(float(difficulty[i]), 3),
+                'discriminacion': round(float(discrimination[i]), 3),
+                'correlacion': round(float(correlation[i]), 3),
+                'distractores': {option: round(float(frequencies[i, j]), 3)
+                                 for j, option in enumerate(self.OPTIONS) if j != self.key[i]},
+                'sin_respuesta': round(float(frequencies[i, -1]), 3)
+            } for i in range(count)]
+        }
+    
+    def run(self, sheets_path: str, output: Optional[str] = None) -> Dict:
+        start = time.perf_counter()
+        students, answers = self.read_sheets(sheets_path)
+        if not students:
+            raise ValueError("El archivo de respuestas no contiene hojas")
+        
+        read = time.perf_counter()
+        report = self.grade(students, answers)
+        graded = time.perf_counter()
+        report['segundos_lectura'] = round(read - start, 4)
+        report['segundos_calificacion'] = round(graded - read, 4)
+        
+        output_path = Path(output) if output else Path(sheets_path).with_name(f"{Path(sheets_path).stem}-notas.json")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        
+        self.print_report(report)
+        print(f"{Colors.GREEN}✓ Informe guardado en {output_path}{Colors.ENDC}")
+        return report
+    
+    def print_report(self, report: Dict):
+        print(f"\n{Colors.BOLD}{'='*80}{Colors.ENDC}")
+        print(f"{Colors.BOLD}{Colors.CYAN}📊 CALIFICACIÓN MASIVA{Colors.ENDC}")
+        print(f"{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+        
+        print(f"{Colors.BOLD}Hojas: {report['hojas']} | Preguntas: {report['preguntas_test']} | "
+              f"Media: {report['media']}% | Mediana: {report['mediana']}% | Desviación: {report['desviacion']}{Colors.ENDC}")
+        
+        for threshold, label, color in QuadraTurboTest.GRADE_BANDS:
+            print(f"  {color}{label:<28}{Colors.ENDC} {report['calificaciones'][label]:>6}")
+        
+        print(f"\n{Colors.BOLD}{'Pregunta':<10}{'Dificultad':>12}{'Discrim.':>10}{'Correl.':>10}  Distractores{Colors.ENDC}")
+        for item in report['items']:
+            distractors = '  '.join(f"{option}:{share:.0%}" for option, share in item['distractores'].items())
+            flagged = (item['discriminacion'] < self.MIN_DISCRIMINATION
+                       or max(item['distractores'].values()) > item['dificultad'])
+            color = Colors.YELLOW if flagged else ''
+            print(f"{color}{item['pregunta']:<10}{item['dificultad']:>12.2f}{item['discriminacion']:>10.2f}"
+                  f"{item['correlacion']:>10.2f}  {distractors}{Colors.ENDC}")
+        
+        print(f"\n{Colors.CYAN}Lectura: {report['segundos_lectura'] * 1000:.1f} ms | "
+              f"Calificación: {report['segundos_calificacion'] * 1000:.1f} ms{Colors.ENDC}")
+
+
+class RequestError(Exception):
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class QuizServer:
+    
+    SESSION_TTL = 1800
+    MAX_SESSIONS = 500
+    MAX_BODY_BYTES = 32 * 1024 * 1024
+    READ_TIMEOUT = 30
+    
+    def __init__(self, app: QuadraTurboTest, host: str = '127.0.0.1', port: int = 8080, workers: int = 4,
+                 session_ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS, document_root: Optional[str] = None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.session_ttl = session_ttl
+        self.max_sessions = max(1, max_sessions)
+        self.document_root = Path(document_root).resolve() if document_root else None
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='quadraturbo')
+        self.sessions: Dict[str, Dict] = {}
+        self.extraction_slots = None
+        self.stats = {
+            'requests': 0, 'errors': 0, 'sessions_created': 0, 'sessions_expired': 0,
+            'sessions_evicted': 0, 'quizzes': 0, 'graded': 0
+        }
+        self.routes = [
+            ('GET', re.compile(r'^/health$'), self.health),
+            ('GET', re.compile(r'^/metrics$'), self.metrics),
+            ('POST', re.compile(r'^/sessions$'), self.create_session),
+            ('GET', re.compile(r'^/sessions/([0-9a-f]+)$'), self.get_session),
+            ('DELETE', re.compile(r'^/sessions/([0-9a-f]+)$'), self.delete_session),
+            ('POST', re.compile(r'^/sessions/([0-9a-f]+)/quiz$'), self.create_quiz),
+            ('POST', re.compile(r'^/sessions/([0-9a-f]+)/answers$'), self.grade_quiz)
+        ]
+        
+    async def run_blocking(self, func: Callable, *args):
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    def session(self, session_id: str) -> Dict:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(404, "Sesión no encontrada o expirada")
+        
+        session['touched'] = time.monotonic()
+        self.sessions[session_id] = self.sessions.pop(session_id)
+        return session
+    
+    def expire_sessions(self):
+        deadline = time.monotonic() - self.session_ttl
+        for session_id in [key for key, session in self.sessions.items() if session['touched'] < deadline]:
+            del self.sessions[session_id]
+            self.stats['sessions_expired'] += 1
+    
+    async def sweep(self):
+        import asyncio
+        
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.session_ttl / 4)))
+            self.expire_sessions()
+    
+    def resolve_path(self, path: str) -> str:
+        if self.document_root is None:
+            raise RequestError(403, "El servidor no admite rutas locales (usa --serve-root)")
+        
+        resolved = (self.document_root / path).resolve()
+        if self.document_root not in resolved.parents:
+            raise RequestError(403, f"Ruta fuera del directorio permitido: {path}")
+        
+        is_valid, result = self.app.validate_file_path(str(resolved))
+        if not is_valid:
+            raise RequestError(400, result)
+        return result
+    
+    def load_documents(self, entries: List[Dict]) -> List[Tuple[str, str]]:
+        documents = []
+        
+        for entry in entries:
+            if 'text' in entry:
+                name = entry.get('name', f"documento{len(documents) + 1}.txt")
+                content = self.app.join_pages(name, [str(entry['text'])])
+                if not content:
+                    raise RequestError(422, f"El documento {name} está vacío")
+                documents.append((name, content))
+                continue
+            
+            if 'path' in entry:
+                path = self.resolve_path(entry['path'])
+                content = self.app.read_files_budgeted([path], self.app.INDEX_CHAR_BUDGET)[0]
+                name = Path(path).name
+            elif 'data' in entry:
+                import base64
+                import tempfile
+                
+                name = entry.get('name', 'documento.pdf')
+                suffix = Path(name).suffix.lower()
+                if suffix not in BatchRunner.SUPPORTED_EXTENSIONS:
+                    raise RequestError(400, f"Extensión no soportada: {suffix}")
+                
+                with tempfile.TemporaryDirectory(prefix='quadraturbo-') as directory:
+                    path = Path(directory) / f"documento{suffix}"
+                    path.write_bytes(base64.b64decode(entry['data'], validate=True))
+                    content = self.app.read_files_budgeted([str(path)], self.app.INDEX_CHAR_BUDGET)[0]
+            else:
+                raise RequestError(400, "Cada documento necesita 'text', 'data' (base64) o 'path'")
+            
+            if not content:
+                raise RequestError(422, f"No se pudo extraer contenido de {name}")
+            documents.append((name, content))
+        
+        return documents
+    
+    def build_quiz(self, workspace: SessionWorkspace, count: int, difficulty: str, topic: Optional[str]) -> List[Dict]:
+        bank_key = self.app.workspace_bank_key(workspace, topic)
+        banked = self.app.fetch_banked(bank_key, count, difficulty, workspace.served)
+        generated: List[Dict] = []
+        
+        if len(banked) < count:
+            deduplicator = QuestionDeduplicator(self.app.bank, bank_key)
+            content = self.app.prepare_content(workspace, topic, count - len(banked))
+            generated, shards = self.app.generate_question_set(content, count - len(banked), difficulty,
+                                                               deduplicator=deduplicator)
+            for shard_content, shard in shards:
+                self.app.store_banked(bank_key, difficulty, shard_content, shard, workspace.served)
+        
+        return banked + generated
+    
+    async def health(self, body: Dict) -> Dict:
+        return {'status': 'ok', 'sessions': len(self.sessions)}
+    
+    async def metrics(self, body: Dict) -> Dict:
+        return {
+            'server': dict(self.stats, sessions=len(self.sessions), workers=self.workers),
+            'api': self.app.scheduler.metrics(),
+            'cache': self.app.cache.stats() if self.app.cache is not None else None
+        }
+    
+    async def create_session(self, body: Dict) -> Dict:
+        import asyncio
+        
+        entries = body.get('documents')
+        if not isinstance(entries, list) or not entries or not all(isinstance(entry, dict) for entry in entries):
+            raise RequestError(400, "Se requiere 'documents': una lista de objetos")
+        
+        try:
+            async with self.extraction_slots:
+                documents = await self.run_blocking(self.load_documents, entries)
+        except (ValueError, TypeError) as e:
+            raise RequestError(400, f"Documento inválido: {str(e)}")
+        
+        if sum(len(text) for _, text in documents) < 100:
+            raise RequestError(422, "Contenido insuficiente para generar preguntas")
+        
+        self.expire_sessions()
+        while len(self.sessions) >= self.max_sessions:
+            del self.sessions[next(iter(self.sessions))]
+            self.stats['sessions_evicted'] += 1
+        
+        session_id = os.urandom(16).hex()
+        self.sessions[session_id] = {
+            'id': session_id,
+            'workspace': SessionWorkspace(documents),
+            'lock': asyncio.Lock(),
+            'quiz': None,
+            'touched': time.monotonic()
+        }
+        self.stats['sessions_created'] += 1
+        
+        return {'session': session_id, 'documentos': [name for name, _ in documents],
+                'caracteres': sum(len(text) for _, text in documents)}
+    
+    async def get_session(self, body: Dict, session_id: str) -> Dict:
+        session = self.session(session_id)
+        quiz = session['quiz']
+        
+        return {
+            'session': session_id,
+            'documentos': [name for name, _ in session['workspace'].documents],
+            'tests': session['workspace'].rounds,
+            'quiz': {'id': quiz['id'], 'preguntas': len(quiz['questions']), 'corregido': quiz['result'] is not None} if quiz else None,
+            'expira_en': round(self.session_ttl - (time.monotonic() - session['touched']), 1)
+        }
+    
+    async def delete_session(self, body: Dict, session_id: str) -> Dict:
+        self.session(session_id)
+        del self.sessions[session_id]
+        return {'session': session_id, 'eliminada': True}
+    
+    async def create_quiz(self, body: Dict, session_id: str) -> Dict:
+        session = self.session(session_id)
+        count = body.get('count', 10)
+        difficulty = body.get('difficulty', 'medio')
+        topic = body.get('topic')
+        
+        if topic is not None and not isinstance(topic, str):
+            raise RequestError(400, "'topic' debe ser un texto")
+        if not isinstance(count, int) or not 1 <= count <= self.app.MAX_QUESTIONS:
+            raise RequestError(400, f"'count' debe ser un entero entre 1 y {self.app.MAX_QUESTIONS}")
+        if difficulty not in self.app.DIFFICULTY_MAP:
+            raise RequestError(400, f"'difficulty' debe ser uno de: {', '.join(self.app.DIFFICULTY_MAP)}")
+        
+        async with session['lock']:
+            questions = await self.run_blocking(self.build_quiz, session['workspace'], count, difficulty, topic or None)
+            
+            if not questions:
+                raise RequestError(502, "No se generó ninguna pregunta válida")
+            
+            session['quiz'] = {
+                'id': os.urandom(8).hex(),
+                'questions': questions,
+                'difficulty': difficulty,
+                'topic': topic or None,
+                'started': time.monotonic(),
+                'result': None
+            }
+            session['workspace'].rounds += 1
+            self.stats['quizzes'] += 1
+        
+        return {
+            'quiz': session['quiz']['id'],
+            'solicitadas': count,
+            'preguntas': [{'numero': i, 'pregunta': q['pregunta'], 'opciones': q['opciones']}
+                          for i, q in enumerate(questions, 1)]
+        }
+    
+    async def grade_quiz(self, body: Dict, session_id: str) -> Dict:
+        session = self.session(session_id)
+        answers = body.get('answers')
+        
+        async with session['lock']:
+            quiz = session['quiz']
+            
+            if quiz is None:
+                raise RequestError(409, "La sesión no tiene un test activo")
+            if quiz['result'] is not None:
+                return quiz['result']
+            if not isinstance(answers, list) or len(answers) != len(quiz['questions']):
+                raise RequestError(400, f"'answers' debe ser una lista de {len(quiz['questions'])} respuestas")
+            
+            elapsed = time.monotonic() - quiz['started']
+            details = []
+            
+            for i, (question, answer) in enumerate(zip(quiz['questions'], answers), 1):
+                answer = str(answer).strip().upper()
+                details.append({
+                    'numero': i,
+                    'respuesta': answer,
+                    'correcta': question['respuesta_correcta'],
+                    'acierto': answer == question['respuesta_correcta'],
+                    'explicacion': question.get('explicacion', '')
+                })
+            
+            correct = sum(detail['acierto'] for detail in details)
+            percentage = correct / len(details) * 100
+            result = {
+                'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'correctas': correct,
+                'total': len(details),
+                'porcentaje': round(percentage, 2),
+                'tiempo': round(elapsed, 2),
+                'dificultad': quiz['difficulty'],
+                'documentos': [name for name, _ in session['workspace'].documents]
+            }
+            
+            if self.app.history is not None:
+                try:
+                    await self.run_blocking(self.app.history.append, result)
+                except OSError as e:
+                    print(f"{Colors.YELLOW}⚠ No se pudo guardar el historial: {str(e)}{Colors.ENDC}")
+            
+            quiz['result'] = dict(result, calificacion=self.app.grade_label(percentage), detalle=details)
+            self.stats['graded'] += 1
+            return quiz['result']
+    
+    async def dispatch(self, method: str, path: str, body: Dict) -> Tuple[int, Dict]:
+        allowed = False
+        
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            return 200, await handler(body, *match.groups())
+        
+        if allowed:
+            raise RequestError(405, f"Método no permitido: {method}")
+        raise RequestError(404, f"Ruta no encontrada: {path}")
+    
+    async def handle(self, reader, writer):
+        import asyncio
+        from http import HTTPStatus
+        from urllib.parse import urlsplit
+        
+        self.stats['requests'] += 1
+        
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.READ_TIMEOUT)
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.READ_TIMEOUT)
+                if line in (b'\r\n', b'\n', b''):
                     break
-                else:
-                    print(f"{Colors.RED}⚠ Respuesta inválida{Colors.ENDC}")
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            length = int(headers.get('content-length', 0))
+            if length > self.MAX_BODY_BYTES:
+                raise RequestError(413, "Cuerpo de la petición demasiado grande")
+            
+            raw = await asyncio.wait_for(reader.readexactly(length), self.READ_TIMEOUT) if length else b''
+            body = json.loads(raw) if raw.strip() else {}
+            if not isinstance(body, dict):
+                raise RequestError(400, "El cuerpo debe ser un objeto JSON")
+            
+            status, payload = await self.dispatch(method.upper(), urlsplit(target).path, body)
+        except RequestError as e:
+            status, payload = e.status, {'error': e.message}
+        except (ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            status, payload = 400, {'error': f"Petición inválida: {str(e)}"}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+        
+        if status >= 400:
+            self.stats['errors'] += 1
+        
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n")
+        
+        try:
+            writer.write(head.encode('latin-1') + data)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+    
+    async def serve(self, ready: Optional[Callable[[], None]] = None):
+        import asyncio
+        
+        self.extraction_slots = asyncio.Semaphore(self.workers)
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        sweeper = asyncio.create_task(self.sweep())
+        
+        print(f"{Colors.GREEN}✓ Servidor escuchando en http://{self.host}:{self.port} "
+              f"({self.workers} trabajadores, sesiones de {self.session_ttl:.0f}s){Colors.ENDC}", flush=True)
+        
+        if ready is not None:
+            ready()
+        
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def run(self):
+        import asyncio
+        
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print(f"\n{Colors.YELLOW}Servidor detenido{Colors.ENDC}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="QuadraTurbo - Sistema Generador de Tests Inteligente")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Procesos para la extracción de PDF (por defecto: número de CPUs, 1 = sin paralelismo)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="Peticiones simultáneas a la API al generar tests grandes")
+    parser.add_argument('--rpm', type=int, default=None,
+                        help="Límite de peticiones por minuto a la API (por defecto 50, 0 = sin límite)")
+    parser.add_argument('--tpm', type=int, default=None,
+                        help="Límite de tokens de entrada por minuto a la API (por defecto 30000, 0 = sin límite)")
+    parser.add_argument('--max-retries', type=int, default=5, help="Reintentos ante errores 429/529 y fallos de red")
+    parser.add_argument('--api-stats', action='store_true', help="Muestra métricas del planificador de peticiones al salir")
+    parser.add_argument('--startup-time', action='store_true', help="Muestra el tiempo de arranque hasta el primer menú y, al salir, el de cada importación diferida")
+    parser.add_argument('--profile', action='store_true', help="Muestra el tiempo de cada etapa al terminar")
+    parser.add_argument('--trace', metavar='ARCHIVO', help="Exporta las trazas de cada etapa como líneas JSON")
+    parser.add_argument('--stream', action='store_true',
+                        help="Empieza el test en cuanto llega la primera pregunta generada")
+    parser.add_argument('--prefetch', action='store_true',
+                        help="Prepara en segundo plano el siguiente test mientras respondes el actual")
+    parser.add_argument('--no-compact', action='store_true',
+                        help="Envía el texto extraído sin quitar cabeceras, pies de página ni espacios repetidos")
+    parser.add_argument('--no-bank', action='store_true', help="No reutiliza preguntas del banco local")
+    parser.add_argument('--bank', help="Ruta del banco de preguntas (por defecto ~/.quadraturbo_bank.db)")
+    parser.add_argument('--batch', metavar='ORIGEN',
+                        help="Modo por lotes sin interacción: directorio o manifiesto JSON de documentos")
+    parser.add_argument('--output', default='quadraturbo_batch', help="Directorio de salida del modo por lotes")
+    parser.add_argument('--count', type=int, default=10, help="Preguntas por documento en modo por lotes")
+    parser.add_argument('--difficulty', choices=list(QuadraTurboTest.DIFFICULTY_MAP), default='medio',
+                        help="Dificultad en modo por lotes")
+    parser.add_argument('--topic', help="Tema en el que enfocar las preguntas en modo por lotes")
+    parser.add_argument('--batch-workers', type=int, default=2, help="Documentos procesados en paralelo en modo por lotes")
+    parser.add_argument('--grade', metavar='TEST',
+                        help="Califica hojas de respuestas contra un test guardado (JSON del modo por lotes)")
+    parser.add_argument('--answers', metavar='ARCHIVO', help="Hojas de respuestas en CSV o Parquet para --grade")
+    parser.add_argument('--grade-output', metavar='ARCHIVO', help="Informe JSON de --grade (por defecto <respuestas>-notas.json)")
+    parser.add_argument('--serve', metavar='[HOST:]PUERTO',
+                        help="Inicia el servidor HTTP/JSON para varios usuarios (por ejemplo 8080 o 0.0.0.0:8080)")
+    parser.add_argument('--serve-root', metavar='DIR', help="Directorio desde el que el servidor puede leer archivos por ruta")
+    parser.add_argument('--session-ttl', type=float, default=QuizServer.SESSION_TTL,
+                        help="Segundos de inactividad antes de descartar una sesión del servidor")
+    parser.add_argument('--server-workers', type=int, default=4, help="Hilos del servidor para extracción y generación")
+    parser.add_argument('--fake-api', action='store_true', help="Usa un sustituto local de la API (sin red)")
+    parser.add_argument('--fake-latency', type=float, default=0.0, help="Latencia simulada por llamada de la API falsa")
+    parser.add_argument('--no-cache', action='store_true', help="Desactiva la caché de texto extraído")
+    parser.add_argument('--cache-dir', help="Directorio de la caché (por defecto ~/.quadraturbo_cache)")
+    parser.add_argument('--cache-max-mb', type=int, default=ExtractionCache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Tamaño máximo de la caché en MB")
+    parser.add_argument('--clear-cache', action='store_true', help="Vacía la caché y termina")
+    parser.add_argument('--invalidate', nargs='+', metavar='ARCHIVO', help="Elimina de la caché los archivos indicados y termina")
+    parser.add_argument('--cache-stats', action='store_true', help="Muestra estadísticas de la caché al salir")
+    return parser.parse_args(argv)
 
 
 def main():
+    args = parse_args()
+    
+    if args.grade:
+        if not args.answers:
+            print(f"{Colors.RED}Error: --grade requiere --answers con las hojas de respuestas{Colors.ENDC}")
+            sys.exit(1)
+        
+        try:
+            BulkGrader.load(args.grade).run(args.answers, args.grade_output)
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            print(f"{Colors.RED}Error calificando: {str(e)}{Colors.ENDC}")
+            sys.exit(1)
+        return
+    
+    if args.no_cache and (args.clear_cache or args.invalidate):
+        print(f"{Colors.RED}Error: --clear-cache e --invalidate no se pueden usar junto con --no-cache{Colors.ENDC}")
+        sys.exit(1)
+    
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    
+    if cache is not None and args.clear_cache:
+        cache.clear()
+        print(f"{Colors.GREEN}✓ Caché vaciada{Colors.ENDC}")
+        return
+    
+    if cache is not None and args.invalidate:
+        for path in args.invalidate:
+            if cache.invalidate(path):
+                print(f"{Colors.GREEN}✓ Eliminado de la caché: {path}{Colors.ENDC}")
+            else:
+                print(f"{Colors.YELLOW}⚠ No estaba en la caché: {path}{Colors.ENDC}")
+        return
+    
+    bank = None
+    if not args.no_bank:
+        try:
+            bank = QuestionBank(args.bank)
+        except sqlite3.Error as e:
+            print(f"{Colors.YELLOW}⚠ No se pudo abrir el banco de preguntas: {str(e)}{Colors.ENDC}")
+    
     try:
-        app = QuadraTurboTest()
-        app.run()
+        rpm = args.rpm if args.rpm is not None else (0 if args.fake_api else 50)
+        tpm = args.tpm if args.tpm is not None else (0 if args.fake_api else 30000)
+        tracer = Tracer(args.trace, args.profile)
+        scheduler = RequestScheduler(rpm, tpm, args.concurrency, args.max_retries, tracer=tracer)
+        app = QuadraTurboTest(cache, args.workers, args.concurrency, bank, scheduler=scheduler, tracer=tracer)
+        app.stream_mode = args.stream
+        app.compact = not args.no_compact
+        app.startup_report = args.startup_time
+        
+        if args.prefetch:
+            app.prefetcher = QuizPrefetcher()
+        
+        if args.fake_api:
+            app.client = FakeAnthropicClient(args.fake_latency)
+        
+        try:
+            if (args.batch or args.serve) and app.client is None and not app.api_key:
+                print(f"{Colors.RED}Error: los modos por lotes y servidor requieren ANTHROPIC_API_KEY o --fake-api{Colors.ENDC}")
+                sys.exit(1)
+            
+            if args.serve:
+                if not app.initialize_api_client():
+                    sys.exit(1)
+                
+                host, _, port = args.serve.rpartition(':')
+                app.history = HistoryStore()
+                server = QuizServer(app, host or '127.0.0.1', int(port), args.server_workers,
+                                    args.session_ttl, document_root=args.serve_root)
+                server.run()
+            elif args.batch:
+                if not app.initialize_api_client():
+                    sys.exit(1)
+                
+                runner = BatchRunner(app, args.output, args.count, args.difficulty, args.topic, args.batch_workers)
+                report = runner.run(args.batch)
+                if report['fallidos'] or report['incompletos']:
+                    sys.exit(1)
+            else:
+                app.run()
+        finally:
+            app.extractor.close()
+            if app.prefetcher is not None:
+                app.prefetcher.close()
+            tracer.close()
+            if args.profile:
+                tracer.print_profile()
+            if args.startup_time:
+                app.print_import_report()
+        
+        if cache is not None and args.cache_stats:
+            print(f"{Colors.CYAN}Caché: {json.dumps(cache.stats())}{Colors.ENDC}")
+        
+        if args.api_stats:
+            print(f"{Colors.CYAN}API: {json.dumps(scheduler.metrics())}{Colors.ENDC}")
     except KeyboardInterrupt:
         print(f"\n\n{Colors.YELLOW}Programa interrumpido por el usuario{Colors.ENDC}\n")
         sys.exit(0)